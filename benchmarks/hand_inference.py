@@ -0,0 +1,99 @@
+"""
+Measures milliseconds per MediaPipe hand inference on full camera frames
+and on the calibrated region cropped and scaled down, as the interactive
+display runs it with HAND_ROI_INFERENCE. Frames are read up front, so
+camera timing does not count.
+
+    python benchmarks/hand_inference.py                       # 300 frames from the camera
+    python benchmarks/hand_inference.py --video hands.mp4     # a recorded clip
+    python benchmarks/hand_inference.py --widths 480 320 256 --margin 40
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.calibration.capture import LatestFrameCapture
+from core.interactive.hand_tracking import HandDetector, inference_crop, ROI_MARGIN, INFERENCE_WIDTH
+
+COORDINATES_PATH = os.path.join(PROJECT_ROOT, "core", "calibration", "coordinates.json")
+
+def calibrated_region(path=COORDINATES_PATH):
+    with open(path, "r") as f:
+        camera = json.load(f)["camera"]
+    (x0, y0), (x1, y1) = camera["tl_corner"], camera["br_corner"]
+    return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], np.int32).reshape((-1, 1, 2))
+
+def read_frames(args):
+    if args.video:
+        capture = cv2.VideoCapture(args.video)
+        frames = []
+        while len(frames) < args.frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(cv2.flip(frame, 1))
+        capture.release()
+        return frames
+
+    capture = LatestFrameCapture()
+    print(f"Camera: {capture}")
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(cv2.flip(frame, 1))
+    capture.release()
+    return frames
+
+def time_inference(frames, crop, width):
+    detector = HandDetector(crop, width)
+    timings = []
+    detections = 0
+    try:
+        for frame in frames:
+            started = time.perf_counter()
+            hands = detector.process(frame)
+            timings.append((time.perf_counter() - started) * 1000)
+            detections += bool(hands)
+    finally:
+        detector.close()
+    return timings, detections
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MediaPipe hand inference, full frame vs cropped region.")
+    parser.add_argument("--video", help="recorded clip to use instead of the camera")
+    parser.add_argument("--frames", type=int, default=300, help="frames to time per mode")
+    parser.add_argument("--margin", type=int, default=ROI_MARGIN, help="camera pixels kept around the region")
+    parser.add_argument("--widths", type=int, nargs="+", default=[INFERENCE_WIDTH],
+                        help="inference widths to measure the cropped mode at")
+    args = parser.parse_args(argv)
+
+    frames = read_frames(args)
+    if not frames:
+        print("No frames to measure.")
+        return
+    crop = inference_crop(calibrated_region(), frames[0].shape, args.margin)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {width}x{height}, region crop {crop[2] - crop[0]}x{crop[3] - crop[1]} at {crop[:2]}")
+
+    modes = [("full frame", None, None)] + [(f"crop -> {w} px wide", crop, w) for w in args.widths]
+    for label, mode_crop, mode_width in modes:
+        timings, detections = time_inference(frames, mode_crop, mode_width)
+        timings = timings[5:] or timings        # the first calls include graph start-up
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{label:>22}: mean {statistics.mean(timings):.1f} ms, median {statistics.median(timings):.1f} ms, "
+              f"p95 {p95:.1f} ms, hands in {detections}/{len(frames)} frames")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Measures how long the display's latest-position refresh takes as the
+position history grows: the live-fleet read from the latest-fix table
+that the display runs, next to the old aggregation over the whole
+history. Synthetic rows go into separate bench_* tables in the
+configured database, so real data is never touched.
+
+    python benchmarks/refresh_latency.py                      # 1M, 10M, 50M rows with indexes
+    python benchmarks/refresh_latency.py --no-indexes         # same, as a baseline
+    python benchmarks/refresh_latency.py --sizes 100000 --explain
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.database.db_setup import (load_credentials, create_tables, create_indexes, POSITION_COLUMNS,
+                                    LATEST_INDEXES)
+from core.database.queries import latest_positions_query, fetch_live_positions
+from core.database.connection import connect, close_connection
+
+POSITIONS_TABLE = "bench_positions"
+VESSELS_TABLE = "bench_vessels"
+LATEST_TABLE = "bench_latest"
+DEFAULT_SIZES = [1_000_000, 10_000_000, 50_000_000]
+INSERT_BATCH = 10000
+WINDOW = timedelta(minutes=10)
+
+# ------- Synthetic Data -------
+def synthetic_rows(count, ships, days, end_time, rng, latest):
+    """Random fixes; `latest` collects the newest per MMSI, as the receiver's upserts would."""
+    span = days * 86400
+    for _ in range(count):
+        row = (
+            200000000 + rng.randrange(ships),
+            (end_time - timedelta(seconds=rng.random() * span)).replace(microsecond=0),
+            36.3 + rng.random() * 1.7,
+            24.2 + rng.random() * 2.2,
+            round(rng.random() * 25, 2),
+            round(rng.random() * 359, 1),
+            rng.randrange(360),
+        )
+        if row[0] not in latest or row[1] >= latest[row[0]][1]:
+            latest[row[0]] = row
+        yield row
+
+def insert_rows(conn, engine, rows):
+    cur = conn.cursor()
+    columns = ", ".join(POSITION_COLUMNS)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            _insert_batch(cur, engine, columns, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        _insert_batch(cur, engine, columns, batch)
+        conn.commit()
+    cur.close()
+
+def _insert_batch(cur, engine, columns, batch):
+    sql = f"INSERT INTO {POSITIONS_TABLE} ({columns}) VALUES "
+    if engine == "postgresql":
+        from psycopg2.extras import execute_values
+        execute_values(cur, sql + "%s", batch, page_size=len(batch))
+    else:
+        cur.executemany(sql + "(" + ", ".join(["%s"] * len(POSITION_COLUMNS)) + ")", batch)
+
+def fill_latest(conn, latest):
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {LATEST_TABLE}")
+    cur.executemany(
+        f"INSERT INTO {LATEST_TABLE} ({', '.join(POSITION_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(POSITION_COLUMNS))})", list(latest.values()))
+    conn.commit()
+    cur.close()
+
+def insert_vessels(conn, ships):
+    cur = conn.cursor()
+    cur.executemany(
+        f"INSERT INTO {VESSELS_TABLE} (mmsi, name, destination) VALUES (%s, %s, %s)",
+        [(200000000 + i, f"VESSEL {i}", "PIRAEUS") for i in range(ships)])
+    conn.commit()
+    cur.close()
+
+# ------- Measurement -------
+def time_refresh(conn, end_time, runs):
+    cur = conn.cursor()
+    query = latest_positions_query(POSITIONS_TABLE, VESSELS_TABLE)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cur.execute(query, (end_time - WINDOW, end_time))
+        rows = cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    cur.close()
+    return timings, len(rows)
+
+def time_live_refresh(conn, end_time, runs):
+    """The display's refresh: one row per ship from the latest-fix table."""
+    cur = conn.cursor()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = fetch_live_positions(cur, end_time - WINDOW, latest=LATEST_TABLE, vessels=VESSELS_TABLE)
+        timings.append((time.perf_counter() - started) * 1000)
+    cur.close()
+    return timings, len(rows)
+
+def summarize(timings):
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    return f"median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms, min {min(timings):.1f} ms"
+
+def explain(conn, engine, end_time):
+    cur = conn.cursor()
+    prefix = {"postgresql": "EXPLAIN ANALYZE ", "sqlite": "EXPLAIN QUERY PLAN "}.get(engine, "EXPLAIN ")
+    cur.execute(prefix + latest_positions_query(POSITIONS_TABLE, VESSELS_TABLE), (end_time - WINDOW, end_time))
+    for row in cur.fetchall():
+        print("    " + " | ".join(str(value) for value in row))
+    cur.close()
+
+def drop_tables(conn):
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {POSITIONS_TABLE}")
+    cur.execute(f"DROP TABLE IF EXISTS {VESSELS_TABLE}")
+    cur.execute(f"DROP TABLE IF EXISTS {LATEST_TABLE}")
+    conn.commit()
+    cur.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the display refresh query on synthetic history.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="table sizes to measure")
+    parser.add_argument("--ships", type=int, default=500, help="distinct MMSIs in the history")
+    parser.add_argument("--days", type=float, default=30, help="days of history the rows are spread over")
+    parser.add_argument("--runs", type=int, default=10, help="refreshes timed per size")
+    parser.add_argument("--no-indexes", action="store_true", help="measure without the position indexes")
+    parser.add_argument("--explain", action="store_true", help="print the query plan for each size")
+    parser.add_argument("--keep", action="store_true", help="keep the bench tables afterwards")
+    args = parser.parse_args(argv)
+
+    credentials = load_credentials()
+    engine = credentials["engine"]
+    conn = connect(credentials)
+    rng = random.Random(42)
+    end_time = datetime.now().replace(microsecond=0)
+
+    drop_tables(conn)
+    cur = conn.cursor()
+    create_tables(cur, engine, positions=POSITIONS_TABLE, vessels=VESSELS_TABLE, latest=LATEST_TABLE)
+    conn.commit()
+    cur.close()
+    insert_vessels(conn, args.ships)
+
+    print(f"{engine}: {args.ships} ships over {args.days:g} days, "
+          f"{'without' if args.no_indexes else 'with'} indexes")
+    loaded = 0
+    latest = {}
+    try:
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            insert_rows(conn, engine, synthetic_rows(size - loaded, args.ships, args.days, end_time, rng, latest))
+            fill_latest(conn, latest)
+            loaded = size
+            load_seconds = time.perf_counter() - started
+
+            cur = conn.cursor()
+            if not args.no_indexes:
+                create_indexes(cur, engine, table=POSITIONS_TABLE)
+                create_indexes(cur, engine, table=LATEST_TABLE, indexes=LATEST_INDEXES)
+            cur.execute(("ANALYZE TABLE " if engine == "mysql" else "ANALYZE ") + POSITIONS_TABLE)
+            if engine == "mysql":
+                cur.fetchall()
+            conn.commit()
+            cur.close()
+
+            timings, ships = time_refresh(conn, end_time, args.runs)
+            live_timings, live_ships = time_live_refresh(conn, end_time, args.runs)
+            print(f"{size:>12,} rows (loaded in {load_seconds:.0f}s):")
+            print(f"    live fleet ({LATEST_TABLE}): {summarize(live_timings)}, {live_ships} ships returned")
+            print(f"    history aggregation:       {summarize(timings)}, {ships} ships returned")
+            if args.explain:
+                explain(conn, engine, end_time)
+    finally:
+        if not args.keep:
+            drop_tables(conn)
+        close_connection(conn)
+
+if __name__ == "__main__":
+    main()
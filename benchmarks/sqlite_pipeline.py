@@ -0,0 +1,156 @@
+"""
+End-to-end ingest and refresh benchmark on the embedded SQLite engine,
+so it runs anywhere without a database server. A writer thread pushes
+synthetic fixes through the receiver's BatchWriter while a reader thread
+runs the display's refresh query on its own connection, as the two
+processes do in a kiosk deployment.
+
+    python benchmarks/sqlite_pipeline.py                      # 200k fixes from 500 ships
+    python benchmarks/sqlite_pipeline.py --fixes 1000000 --batch 500
+    python benchmarks/sqlite_pipeline.py --path bench.db --keep
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.ais.db_writer import BatchWriter
+from core.database.db_setup import upgrade_database
+from core.database.queries import fetch_live_positions
+from core.database.sqlite_backend import connect_sqlite
+
+WINDOW = timedelta(minutes=10)
+
+# ------- Synthetic Data -------
+def synthetic_fixes(count, ships, rng):
+    """Ships wander around the Cyclades; every fix is stamped with the current time."""
+    positions = [[36.3 + rng.random() * 1.7, 24.2 + rng.random() * 2.2] for _ in range(ships)]
+    for i in range(count):
+        ship = rng.randrange(ships)
+        lat, lon = positions[ship]
+        lat += (rng.random() - 0.5) * 0.002
+        lon += (rng.random() - 0.5) * 0.002
+        positions[ship] = [lat, lon]
+        yield (200000000 + ship, datetime.now().replace(microsecond=0), round(lat, 6), round(lon, 6),
+               round(rng.random() * 25, 2), round(rng.random() * 359, 1), rng.randrange(360))
+
+# ------- Workers -------
+def ingest(path, args, result):
+    conn = connect_sqlite(path)
+    writer = BatchWriter(conn, "sqlite", max_rows=args.batch, max_delay_ms=args.max_delay_ms)
+    now = datetime.now()
+    for i in range(args.ships):
+        writer.upsert_vessel(200000000 + i, {"name": f"VESSEL {i}", "destination": "PIRAEUS"}, now)
+
+    flush_ms = []
+    started = time.perf_counter()
+    for row in synthetic_fixes(args.fixes, args.ships, random.Random(args.seed)):
+        writer.add(row)
+        writer.update_latest(row)
+        if writer.due():
+            flush_started = time.perf_counter()
+            writer.flush()
+            flush_ms.append((time.perf_counter() - flush_started) * 1000)
+    writer.close()
+    result["seconds"] = time.perf_counter() - started
+    result["flush_ms"] = flush_ms
+    result["summary"] = writer.report()
+    conn.close()
+
+def refresh(path, interval, done, result):
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    timings = []
+    ships = 0
+    while not done.is_set():
+        started = time.perf_counter()
+        ships = len(fetch_live_positions(cursor, datetime.now() - WINDOW))
+        timings.append((time.perf_counter() - started) * 1000)
+        done.wait(interval)
+    result["refresh_ms"] = timings
+    result["ships"] = ships
+    cursor.close()
+    conn.close()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * fraction) - 1)] if ordered else 0.0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest and display refresh on SQLite.")
+    parser.add_argument("--fixes", type=int, default=200000, help="position fixes to ingest")
+    parser.add_argument("--ships", type=int, default=500, help="distinct MMSIs")
+    parser.add_argument("--batch", type=int, default=200, help="BatchWriter max rows per flush")
+    parser.add_argument("--max-delay-ms", type=int, default=1000, help="BatchWriter max delay")
+    parser.add_argument("--refresh-interval", type=float, default=0.05,
+                        help="seconds between display refreshes during ingest")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic fleet")
+    parser.add_argument("--path", help="database file (default: a temporary file)")
+    parser.add_argument("--keep", action="store_true", help="keep the database file afterwards")
+    args = parser.parse_args(argv)
+
+    workdir = None
+    if args.path:
+        path = os.path.abspath(args.path)
+    else:
+        workdir = tempfile.mkdtemp(prefix="ais_bench_")
+        path = os.path.join(workdir, "bench.db")
+
+    conn = connect_sqlite(path)
+    upgrade_database(conn, "sqlite")
+    conn.close()
+
+    ingest_result, refresh_result = {}, {}
+    done = threading.Event()
+    reader = threading.Thread(target=refresh, args=(path, args.refresh_interval, done, refresh_result))
+    reader.start()
+    try:
+        ingest(path, args, ingest_result)
+    finally:
+        done.set()
+        reader.join()
+
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    idle_ms = []
+    for _ in range(20):
+        started = time.perf_counter()
+        fetch_live_positions(cursor, datetime.now() - WINDOW)
+        idle_ms.append((time.perf_counter() - started) * 1000)
+    cursor.execute("SELECT COUNT(*) FROM positions")
+    stored = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+
+    seconds = ingest_result["seconds"]
+    flush_ms = ingest_result["flush_ms"]
+    busy_ms = refresh_result["refresh_ms"]
+    print(f"sqlite: {args.fixes} fixes from {args.ships} ships, batches of {args.batch}")
+    print(f"Ingest:  {stored} rows in {seconds:.1f}s = {stored / seconds:.0f} rows/s | "
+          f"flush median {statistics.median(flush_ms):.1f} ms, p95 {percentile(flush_ms, 0.95):.1f} ms")
+    print(f"Refresh during ingest: {len(busy_ms)} runs, median {statistics.median(busy_ms):.1f} ms, "
+          f"p95 {percentile(busy_ms, 0.95):.1f} ms, {refresh_result['ships']} ships")
+    print(f"Refresh when idle:     median {statistics.median(idle_ms):.1f} ms, "
+          f"p95 {percentile(idle_ms, 0.95):.1f} ms")
+    print(ingest_result["summary"])
+
+    if args.keep:
+        print(f"Kept {path}")
+    else:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        if workdir:
+            os.rmdir(workdir)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import argparse
 import serial
 import requests
 from bs4 import BeautifulSoup
@@ -11,41 +13,47 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from core.database.db_setup import load_credentials
+from core.database.connection import connect, close_connection
+from core.database.notify import UpdateNotifier
+from core.database.retention import RetentionWorker
+from core.ais.ship_cache import ShipCache, DETAIL_FIELDS
+from core.ais.enrichment import EnrichmentPool, HostRateLimiter, RateLimitedSession
+from core.ais.db_writer import BatchWriter
+from core.ais.sources import SerialSource, ReplaySource
+from core.ais.ingest import IngestHub, ThreadedSource, TCPClientSource, TCPServerSource, UDPSource
+from core.ais.assembler import SentenceAssembler, STATIC_TYPES
+from core.ais.dedup import Deduplicator, payload_key, message_key
+from core.ais.downsample import MovementFilter
+from core.ais.live_fleet import LiveFleetWriter
+from core.ais.spool import Spool
+from core.ais.metrics import Metrics, MetricsServer, METRICS_PORT
 
 SERIAL_PORT = "COM5"
 BAUD_RATE = 4800
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGE_DIR = os.path.join(BASE_DIR, "..",".." "images", "ships")
-
-# ------- Database Connection -------
-def connect_database(credentials):
-    engine = credentials["engine"]
-
-    if engine == "postgresql":
-        import psycopg2
-        conn = psycopg2.connect(
-            host=credentials["host"],
-            database=credentials["database"],
-            user=credentials["user"],
-            password=credentials["password"],
-            port=credentials["port"]
-        )
-    elif engine == "mysql":
-        import mysql.connector
-        conn = mysql.connector.connect(
-            host=credentials["host"],
-            database=credentials["database"],
-            user=credentials["user"],
-            password=credentials["password"],
-            port=int(credentials["port"])
-        )
-    else:
-        raise ValueError("Unsupported database engine: must be 'postgresql' or 'mysql'.")
-
-    return conn, conn.cursor()
+SHIP_CACHE_TTL = 6 * 60 * 60        # seconds before a known ship is scraped again
+SHIP_CACHE_MAX_ENTRIES = 5000
+SHIP_CACHE_SAVE_INTERVAL = 60       # seconds between cache writes to disk
+LOOKUP_RETRY_DELAY = 10 * 60        # seconds before a failed vessel lookup is tried again
+ENRICH_WORKERS = 4
+ENRICH_MAX_PENDING = 256
+ENRICH_RATE_PER_HOST = 1.0          # requests per second to each host
+REQUEST_TIMEOUT = 10
+BATCH_MAX_ROWS = 200                # flush after this many positions...
+BATCH_MAX_DELAY_MS = 1000           # ...or once the oldest one has waited this long
+THROUGHPUT_REPORT_INTERVAL = 10     # seconds between one-line pipeline summaries
+RETENTION_INTERVAL = 3600           # seconds between history partition/retention runs
+DEDUP_WINDOW = 10.0                 # seconds a repeated message counts as a duplicate
+STORE_MIN_DISTANCE = 50.0           # metres a ship must move before its position is stored again...
+STORE_MIN_TURN = 10.0               # ...or degrees it must turn...
+STORE_MAX_SILENCE = 180.0           # ...or seconds since its last stored position
+SPOOL_DIR = os.path.join(BASE_DIR, "spool")   # batches kept here while the database is down
+SPOOL_MAX_BYTES = 512 * 1024 * 1024
+LIVE_FLEET_MAX_AGE = 600            # seconds before a silent ship leaves the shared-memory fleet
 
 # ------- Ship Info Extraction -------
-def fetch_ship_details(mmsi):
+def fetch_ship_details(mmsi, session=requests):
     url = f"https://www.vesselfinder.com/vessels/details/{mmsi}"
     headers = {
         'User-Agent': 'Mozilla/5.0',
@@ -53,7 +61,7 @@ def fetch_ship_details(mmsi):
         'Accept-Language': 'en-US,en;q=0.9',
     }
 
-    response = requests.get(url, headers=headers)
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
     soup = BeautifulSoup(response.content, 'html.parser')
 
     name = image_url = nav_status = destination = eta = None
@@ -90,12 +98,12 @@ def fetch_ship_details(mmsi):
 
     return name, image_url, nav_status, destination, eta
 
-def save_ship_image(mmsi, url):
+def save_ship_image(mmsi, url, session=requests):
     os.makedirs(IMAGE_DIR, exist_ok=True)
     local_path = os.path.join(IMAGE_DIR, f"{mmsi}.jpg")
 
     try:
-        response = requests.get(url, stream=True)
+        response = session.get(url, stream=True, timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
             with open(local_path, 'wb') as file:
                 for chunk in response.iter_content(1024):
@@ -106,70 +114,363 @@ def save_ship_image(mmsi, url):
 
     return None
 
+def lookup_ship(mmsi, session):
+    name, image_url, nav_status, destination, eta = fetch_ship_details(mmsi, session)
+    image_path = save_ship_image(mmsi, image_url, session) if image_url else None
+    return {
+        "name": name,
+        "image_path": image_path,
+        "navigation_status": nav_status,
+        "destination": destination,
+        "eta": eta,
+    }
+
+# ------- Static Vessel Data -------
+def _clean_text(value):
+    return (value or "").strip(" @") or None
+
+def static_details(msg, msg_type):
+    if msg_type == 5:
+        eta = None
+        if msg.month and msg.day and msg.hour < 24 and msg.minute < 60:
+            eta = f"{msg.day:02d}/{msg.month:02d} {msg.hour:02d}:{msg.minute:02d}"
+        return {
+            "name": _clean_text(msg.shipname),
+            "destination": _clean_text(msg.destination),
+            "eta": eta,
+        }
+    # Type 24 part A carries the name, part B only call sign and dimensions
+    return {"name": _clean_text(getattr(msg, "shipname", None))}
+
+def _available(value, unavailable):
+    # AIS encodes "not available" as a sentinel value at the top of each field's range
+    return None if value is None or value >= unavailable else value
+
+def format_counts(counter):
+    return ", ".join(f"{key}={count}" for key, count in counter.most_common()) or "none"
+
+# ------- Pipeline Metrics -------
+def create_metrics(hub, assembler, dedup, movement, pool, writer):
+    """Per-stage counters and latency histograms, plus gauges read from the pipeline at scrape time."""
+    metrics = Metrics()
+    stages = {
+        "sentences": metrics.counter("sentences_total", "NMEA sentences read, by input", "source"),
+        "messages": metrics.counter("messages_total", "AIS messages decoded, by type", "type"),
+        "lookups": metrics.counter("lookups_total", "Ship detail lookups, by result", "result"),
+        "read": metrics.histogram("read_seconds", "Time from reading a sentence to processing it"),
+        "decode": metrics.histogram("decode_seconds", "Time to decode one message"),
+        "enrich": metrics.histogram("enrich_seconds", "Time from lookup request to result"),
+        "persist": metrics.histogram("persist_seconds", "Time to write one batch to the database"),
+    }
+    metrics.collected("errors_total", "Rejected sentences and messages, by reason", "counter",
+                      lambda: dict(assembler.errors), "reason")
+    metrics.collected("skipped_total", "Messages of unused types, by type", "counter",
+                      lambda: dict(assembler.skipped), "type")
+    metrics.collected("duplicates_total", "Duplicate messages dropped, by input", "counter",
+                      lambda: dict(dedup.suppressed), "source")
+    metrics.collected("input_dropped_total", "Sentences lost to a full ingest queue, by input", "counter",
+                      lambda: {source.tag: source.stats.dropped for source in hub.sources}, "source")
+    metrics.collected("positions_total", "Position fixes, by outcome", "counter",
+                      lambda: {"stored": movement.stored, "filtered": movement.skipped}, "outcome")
+    metrics.collected("db_rows_total", "Position rows, by outcome", "counter",
+                      lambda: {"written": writer.total_rows, "failed": writer.failed_rows,
+                               "spooled": writer.spool.spooled_rows if writer.spool else 0}, "outcome")
+    metrics.collected("queue_depth", "Items waiting, by queue", "gauge",
+                      lambda: {"ingest": hub.qsize(), "enrich": len(pool), "write": len(writer),
+                               "spool": writer.spool.pending_rows if writer.spool else 0}, "queue")
+    return metrics, stages
+
+def _ms(histogram):
+    value = histogram.quantile(0.95)
+    return "-" if value is None else f"{value * 1000:g}"
+
+def summary_line(stages, assembler, movement, hub, pool, writer, sentences, elapsed):
+    """One line covering the last `elapsed` seconds, in which `sentences` sentences were read."""
+    spooled = writer.spool.pending_rows if writer.spool else 0
+    db_rate, _ = writer.window_rate()
+    return (f"{sentences / elapsed if elapsed > 0 else 0:.1f} sentences/s | "
+            f"messages {stages['messages'].total()} | stored {movement.stored}, filtered {movement.skipped} | "
+            f"errors {sum(assembler.errors.values())} | "
+            f"db {db_rate:.1f} rows/s, {writer.total_rows} rows, failed {writer.failed_rows} | "
+            f"queues ingest {hub.qsize()} enrich {len(pool)} write {len(writer)} spool {spooled} | "
+            f"p95 ms read {_ms(stages['read'])} decode {_ms(stages['decode'])} "
+            f"enrich {_ms(stages['enrich'])} persist {_ms(stages['persist'])}")
+
+def timed_flush(writer, histogram):
+    started = time.perf_counter()
+    try:
+        return writer.flush()
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+# ------- Input Sources -------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Decode AIS sentences and store ship positions.")
+    parser.add_argument("--port", help=f"serial port of the AIS receiver (default {SERIAL_PORT} "
+                                       "when no other input is given)")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE, help="serial baud rate")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded NMEA log")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed multiplier, 0 replays as fast as possible")
+    parser.add_argument("--tcp", action="append", default=[], metavar="[TAG=]HOST:PORT",
+                        help="connect to a TCP NMEA feed (repeatable)")
+    parser.add_argument("--tcp-listen", action="append", default=[], metavar="[TAG=][HOST:]PORT",
+                        help="accept NMEA pushed over TCP (repeatable)")
+    parser.add_argument("--udp", action="append", default=[], metavar="[TAG=][HOST:]PORT",
+                        help="listen for NMEA datagrams (repeatable)")
+    parser.add_argument("--dedup-key", choices=["payload", "message"], default="payload",
+                        help="match duplicates on the raw payload, or on (MMSI, type, AIS second)")
+    parser.add_argument("--dedup-window", type=float, default=DEDUP_WINDOW,
+                        help="seconds within which a repeated message is dropped, 0 disables")
+    parser.add_argument("--min-distance", type=float, default=STORE_MIN_DISTANCE,
+                        help="metres moved before a new position is stored, 0 stores every fix")
+    parser.add_argument("--min-turn", type=float, default=STORE_MIN_TURN,
+                        help="degrees of course change that force a new stored position")
+    parser.add_argument("--max-silence", type=float, default=STORE_MAX_SILENCE,
+                        help="seconds after which a position is stored even if the ship has not moved")
+    parser.add_argument("--no-enrich", action="store_true",
+                        help="skip VesselFinder lookups (useful when benchmarking a replay)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help=f"local port of the Prometheus metrics endpoint, 0 to disable (default {METRICS_PORT})")
+    return parser.parse_args(argv)
+
+def parse_endpoint(text, kind, default_host):
+    tag, _, address = text.rpartition("=")
+    host, _, port = address.rpartition(":")
+    host = host or default_host
+    return tag or f"{kind}:{host}:{port}", host, int(port)
+
+def open_sources(args):
+    sources = []
+    if args.replay:
+        sources.append(ThreadedSource(f"replay:{os.path.basename(args.replay)}",
+                                      ReplaySource(args.replay, speed=args.speed)))
+    for text in args.tcp:
+        sources.append(TCPClientSource(*parse_endpoint(text, "tcp", "localhost")))
+    for text in args.tcp_listen:
+        sources.append(TCPServerSource(*parse_endpoint(text, "tcp-listen", "0.0.0.0")))
+    for text in args.udp:
+        sources.append(UDPSource(*parse_endpoint(text, "udp", "0.0.0.0")))
+
+    if args.port or not sources:
+        port = args.port or SERIAL_PORT
+        sources.insert(0, ThreadedSource(f"serial:{port}", SerialSource(port, args.baud)))
+    return sources
+
 # ------- Main Loop -------
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=2)
-        print(f"Listening on {SERIAL_PORT} @ {BAUD_RATE} baud...\n")
-    except serial.SerialException as e:
-        print(f"❌ Failed to open serial port: {e}")
+        hub = IngestHub(open_sources(args))
+    except (serial.SerialException, OSError, ValueError) as e:
+        print(f"❌ Failed to open input source: {e}")
         return
 
     credentials = load_credentials()
-    conn, cursor = connect_database(credentials)
+    # Waits for the database at startup; afterwards a dropped connection is
+    # replaced with backoff while the receiver keeps reading
+    conn = connect(credentials, wait=True)
+    notifier = UpdateNotifier(credentials["engine"])
+    spool = Spool(SPOOL_DIR, max_bytes=SPOOL_MAX_BYTES)
+    if spool.pending:
+        print(f"Found {spool.pending_rows} spooled rows from a previous run, they are written first.")
+    writer = BatchWriter(conn, credentials["engine"],
+                         max_rows=BATCH_MAX_ROWS, max_delay_ms=BATCH_MAX_DELAY_MS,
+                         notifier=notifier, spool=spool)
+    last_report = time.time()
+    retention = RetentionWorker(credentials, interval=RETENTION_INTERVAL)
     print(f"Connected to {credentials['engine']} database.")
+
+    # Shared-memory fleet for the display: the real-time path, next to the durable database
+    try:
+        live = LiveFleetWriter()
+    except OSError as err:
+        live = None
+        print(f"Live fleet buffer unavailable, display will read the database only: {err}")
+
+    cache = ShipCache(ttl=SHIP_CACHE_TTL, max_entries=SHIP_CACHE_MAX_ENTRIES)
+    last_cache_save = time.time()
+    print(f"Loaded {len(cache)} cached ships.")
+
+    session = RateLimitedSession(HostRateLimiter(ENRICH_RATE_PER_HOST), pool_size=ENRICH_WORKERS)
+    pool = EnrichmentPool(lambda mmsi: lookup_ship(mmsi, session),
+                          workers=ENRICH_WORKERS, max_pending=ENRICH_MAX_PENDING)
     print("--------------------------------------------------\n")
 
+    hub.start()
+    print(f"Listening on {hub}...\n")
+    retention.start()
+
+    assembler = SentenceAssembler()
+    errors = assembler.errors
+    dedup = Deduplicator(window=args.dedup_window)
+    # The dedup window runs on wall-clock time, so a replay faster than real time would
+    # squeeze distinct reports into one window; such replays skip the duplicate check
+    undeduplicated = set()
+    if args.replay and not 0 < args.speed <= 1:
+        undeduplicated.add(f"replay:{os.path.basename(args.replay)}")
+        if args.dedup_window > 0:
+            print("Duplicate filtering is off for the replay, which runs faster than real time.")
+    movement = MovementFilter(min_distance=args.min_distance, min_turn=args.min_turn,
+                              max_silence=args.max_silence)
+    metrics, stages = create_metrics(hub, assembler, dedup, movement, pool, writer)
+    server = None
+    if args.metrics_port:
+        try:
+            server = MetricsServer(metrics, port=args.metrics_port)
+            server.start()
+            print(f"Metrics on {server}")
+        except OSError as err:
+            print(f"Metrics endpoint unavailable: {err}")
+    started_at = time.monotonic()
+    lines_read = 0
+    lines_at_report = 0
+
     try:
         while True:
-            line = ser.readline().decode("ascii", errors="replace").strip()
-            if not line:
+            if time.time() - last_cache_save >= SHIP_CACHE_SAVE_INTERVAL:
+                cache.save()
+                last_cache_save = time.time()
+
+            if live is not None:
+                live.heartbeat()
+
+            if writer.due():
+                try:
+                    timed_flush(writer, stages["persist"])
+                except Exception as err:
+                    print(f"Error writing positions to database: {err}")
+
+            if time.time() - last_report >= THROUGHPUT_REPORT_INTERVAL:
+                print(summary_line(stages, assembler, movement, hub, pool, writer,
+                                   lines_read - lines_at_report, time.time() - last_report))
+                lines_at_report = lines_read
+                movement.prune()
+                if live is not None:
+                    live.expire(LIVE_FLEET_MAX_AGE)
+                last_report = time.time()
+
+            for mmsi, details, error, submitted_at in pool.drain():
+                if submitted_at is not None:
+                    stages["enrich"].observe(time.time() - submitted_at)
+                if error is not None:
+                    stages["lookups"].inc(label="error")
+                    cache.defer(mmsi, LOOKUP_RETRY_DELAY)
+                    continue
+                stages["lookups"].inc(label="ok")
+                # Keep what AIS static messages told us where the scrape found nothing
+                known = cache.get(mmsi, allow_expired=True) or {}
+                details = cache.put(mmsi, {**known, **{key: value for key, value in details.items() if value}})
+                writer.upsert_vessel(mmsi, details, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                if live is not None:
+                    live.update_details(mmsi, details)
+
+            item = hub.get()
+            if item is None:
+                if hub.finished:
+                    print("All input sources have finished.")
+                    break
                 continue
+            tag, line, read_at = item
+            lines_read += 1
+            stages["sentences"].inc(label=tag)
+            stages["read"].observe(time.monotonic() - read_at)
+
+            assembled = assembler.feed(line, source=tag)
+            if assembled is None:
+                continue
+            msg_type, sentences = assembled
+
+            check_dedup = args.dedup_window > 0 and tag not in undeduplicated
+            check_message = check_dedup and args.dedup_key == "message"
+            if check_dedup and not check_message:
+                if dedup.is_duplicate(payload_key(sentences), tag):
+                    continue
 
+            decode_started = time.perf_counter()
             try:
-                msg = decode(line)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                mmsi = msg.mmsi
-                lat = msg.lat
-                lon = msg.lon
-                speed = msg.speed
-
-                name, image_url, nav_status, destination, eta = fetch_ship_details(mmsi)
-                image_path = save_ship_image(mmsi, image_url) if image_url else None
-
-                print(f"{timestamp} | MMSI {mmsi} - {name or 'Unknown'}")
-                print(f"Position: ({lat}, {lon}) | Speed: {speed}")
-                if destination:
-                    print(f"Destination: {destination} | ETA: {eta}")
-                if nav_status:
-                    print(f"Navigation Status: {nav_status}")
-                print("Image:", "Downloaded" if image_path else "Not available")
-
-                cursor.execute(
-                    """
-                    INSERT INTO ships (
-                        timestamp, mmsi, latitude, longitude, speed,
-                        name, image_path, navigation_status, destination, eta
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (timestamp, mmsi, lat, lon, speed, name, image_path, nav_status, destination, eta)
-                )
-                conn.commit()
-                print("Inserted into database.")
-                print("--------------------------------------------------")
-
-            except Exception as err:
-                print(f"Error processing AIS message: {err}")
-                print("--------------------------------------------------")
+                msg = decode(*sentences)
+            except Exception:
+                errors["decode"] += 1
+                continue
+            finally:
+                stages["decode"].observe(time.perf_counter() - decode_started)
+            stages["messages"].inc(label=msg_type)
+
+            if check_message:
+                second = getattr(msg, "second", None)
+                # Seconds 60-63 mean the time stamp is not available, so they cannot tell fixes apart
+                if second is not None and second < 60:
+                    key = message_key(msg.mmsi, msg_type, second)
+                else:
+                    key = payload_key(sentences)
+                if dedup.is_duplicate(key, tag):
+                    continue
+
+            if msg_type in STATIC_TYPES:
+                details = cache.update(msg.mmsi, static_details(msg, msg_type))
+                writer.upsert_vessel(msg.mmsi, details, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                if live is not None:
+                    live.update_details(msg.mmsi, details)
+                continue
+
+            mmsi = msg.mmsi
+            lat = msg.lat
+            lon = msg.lon
+            speed = _available(msg.speed, 102.3)
+            course = _available(getattr(msg, "course", None), 360)
+            heading = _available(getattr(msg, "heading", None), 511)
+            if lat is None or lon is None or abs(lat) > 90 or abs(lon) > 180:
+                errors["no_position"] += 1
+                continue
+
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            details = cache.get(mmsi)
+            if details is None:
+                # Miss or expired: look it up in the background and store
+                # the position now with whatever we already know
+                if not args.no_enrich:
+                    pool.submit(mmsi)
+                details = cache.get(mmsi, allow_expired=True) or dict.fromkeys(DETAIL_FIELDS)
+
+            row = (mmsi, timestamp, lat, lon, speed, course, heading)
+            writer.update_latest(row)
+            if live is not None:
+                if mmsi not in live.slots:
+                    live.update_details(mmsi, details)
+                live.update_position(mmsi, lat, lon, speed, course, heading)
+            if not movement.should_store(mmsi, lat, lon, course):
+                continue
+            writer.add(row)
 
     except KeyboardInterrupt:
         print("\nStopping receiver...")
 
     finally:
-        ser.close()
-        cursor.close()
-        conn.close()
+        if server is not None:
+            server.stop()
+        retention.stop()
+        pool.shutdown()
+        session.close()
+        cache.save()
+        hub.stop()
+        try:
+            writer.close()
+            print(writer.report())
+        except Exception as err:
+            print(f"Error writing positions to database: {err}")
+        elapsed = time.monotonic() - started_at
+        print(f"Processed {lines_read} sentences in {elapsed:.1f}s "
+              f"({lines_read / elapsed if elapsed > 0 else 0:.1f} sentences/s).")
+        print(f"Parse errors: {format_counts(errors)} | skipped types: {format_counts(assembler.skipped)}")
+        print(f"Inputs: {hub.report()}")
+        print(f"Duplicates: {dedup.report()}")
+        print(f"Downsampling: {movement.report()}")
+        notifier.close()
+        if live is not None:
+            live.close()
+        close_connection(conn)
         print("All connections closed. Receiver stopped.")
 
 
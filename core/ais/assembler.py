@@ -0,0 +1,110 @@
+import time
+from collections import Counter
+
+POSITION_TYPES = frozenset({1, 2, 3, 18, 19, 27})
+STATIC_TYPES = frozenset({5, 24})
+FRAGMENT_TIMEOUT = 5.0      # seconds to wait for the remaining parts of a multi-sentence message
+
+def message_type(payload):
+    """AIS message type from the first armoured payload character, without a full decode."""
+    value = ord(payload[0]) - 48
+    if value > 40:
+        value -= 8
+    return value
+
+def checksum_ok(sentence):
+    body, star, checksum = sentence[1:].partition("*")
+    if not star:
+        return False
+    calculated = 0
+    for char in body:
+        calculated ^= ord(char)
+    try:
+        return calculated == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+class SentenceAssembler:
+    """
+    Streaming reassembly of multi-sentence AIS messages (e.g. type 5).
+
+    feed() takes one raw line and returns (msg_type, [sentences]) once a
+    message is complete, or None while fragments are still buffered or the
+    line was dropped. Fragments are grouped by source, channel and sequence
+    ID, so overlapping receivers delivering the same message interleaved are
+    reassembled separately, and discarded after `timeout` seconds. Messages whose type is not in
+    `wanted_types` are skipped before any decoding. Problems are counted in
+    `errors` and `skipped` rather than raised.
+    """
+    def __init__(self, wanted_types=POSITION_TYPES | STATIC_TYPES, timeout=FRAGMENT_TIMEOUT):
+        self.wanted_types = wanted_types
+        self.timeout = timeout
+        self.partial = {}           # (source, channel, seq_id) -> {"started", "count", "type", "parts"}
+        self.errors = Counter()
+        self.skipped = Counter()    # msg_type -> count
+
+    def feed(self, line, now=None, source=None):
+        now = time.monotonic() if now is None else now
+        if self.partial:
+            self._expire(now)
+
+        if not line.startswith(("!", "$")):
+            self.errors["not_nmea"] += 1
+            return None
+        if not checksum_ok(line):
+            self.errors["checksum"] += 1
+            return None
+
+        fields = line.split(",")
+        if len(fields) < 7 or not fields[5]:
+            self.errors["malformed"] += 1
+            return None
+        try:
+            count, number = int(fields[1]), int(fields[2])
+        except ValueError:
+            self.errors["malformed"] += 1
+            return None
+
+        if count == 1:
+            msg_type = message_type(fields[5])
+            if msg_type not in self.wanted_types:
+                self.skipped[msg_type] += 1
+                return None
+            return msg_type, [line]
+
+        key = (source, fields[4], fields[3])
+        if number == 1:
+            if key in self.partial:
+                self.errors["fragment_incomplete"] += 1
+            msg_type = message_type(fields[5])
+            self.partial[key] = {"started": now, "count": count, "type": msg_type, "parts": [line]}
+            if msg_type not in self.wanted_types:
+                # Keep a marker so the remaining fragments are swallowed quietly
+                self.skipped[msg_type] += 1
+                self.partial[key]["parts"] = None
+            return None
+
+        entry = self.partial.get(key)
+        if entry is None or entry["count"] != count:
+            self.errors["fragment_orphan"] += 1
+            return None
+        if entry["parts"] is None:
+            if number == count:
+                del self.partial[key]
+            return None
+        if number != len(entry["parts"]) + 1:
+            self.errors["fragment_order"] += 1
+            del self.partial[key]
+            return None
+
+        entry["parts"].append(line)
+        if number < count:
+            return None
+        del self.partial[key]
+        return entry["type"], entry["parts"]
+
+    def _expire(self, now):
+        for key in [key for key, entry in self.partial.items() if now - entry["started"] > self.timeout]:
+            if self.partial[key]["parts"] is not None:
+                self.errors["fragment_timeout"] += 1
+            del self.partial[key]
@@ -0,0 +1,228 @@
+import time
+
+from core.database.connection import DatabaseUnavailable
+from core.database.db_setup import POSITION_COLUMNS, VESSEL_COLUMNS, vessel_upsert_sql, latest_upsert_sql
+
+DEFAULT_MAX_ROWS = 200
+DEFAULT_MAX_DELAY_MS = 1000
+DEFAULT_DRAIN_ROWS = 5000           # positions per transaction when replaying the spool
+DEFAULT_DRAIN_BUDGET = 0.25         # seconds of spool replay per flush, so ingest keeps up meanwhile
+
+INSERT_SQL = "INSERT INTO positions ({columns}) VALUES {values}"
+
+class BatchWriter:
+    """
+    Buffers position rows, latest-fix upserts and vessel upserts and writes
+    them in one transaction when either `max_rows` positions are waiting or
+    the oldest change has waited `max_delay_ms`, whichever comes first.
+
+    Positions go in as one multi-row INSERT: PostgreSQL uses psycopg2's
+    execute_values; mysql.connector rewrites executemany on an INSERT into
+    a single multi-row statement; SQLite reuses one prepared statement
+    inside the transaction. Only the newest fix and details per
+    vessel are kept for the upserts.
+
+    With a spool, a batch that fails because the database cannot be
+    reached is appended to it instead of being lost, and later batches go
+    behind it until the spool has been drained. Draining runs in chunks
+    of `drain_rows` for at most `drain_budget` seconds per flush, once per
+    `max_delay_ms`, also when no new rows arrive. A batch the database
+    rejects for its data is counted as failed and dropped, so it can never
+    block the spool.
+    """
+    def __init__(self, conn, engine, max_rows=DEFAULT_MAX_ROWS, max_delay_ms=DEFAULT_MAX_DELAY_MS,
+                 notifier=None, spool=None, drain_rows=DEFAULT_DRAIN_ROWS, drain_budget=DEFAULT_DRAIN_BUDGET):
+        self.conn = conn
+        self.notifier = notifier    # optional UpdateNotifier told about every committed batch
+        self.spool = spool          # optional Spool that keeps batches the database refused
+        self.drain_rows = drain_rows
+        self.drain_budget = drain_budget
+        self.next_drain_at = 0.0
+        # Errors that mean the connection failed, not the statement; only these are spooled
+        pool = getattr(conn, "pool", None)
+        self.transient_errors = (DatabaseUnavailable,) + getattr(pool, "transient_errors", ())
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self.buffer = []
+        self.vessels = {}           # mmsi -> vessel row waiting to be upserted
+        self.latest = {}            # mmsi -> newest position row for ship_latest
+        self.first_row_at = None
+
+        self.columns = ", ".join(POSITION_COLUMNS)
+        self.placeholders = "(" + ", ".join(["%s"] * len(POSITION_COLUMNS)) + ")"
+        self.upsert_sql = vessel_upsert_sql(engine)
+        self.latest_sql = latest_upsert_sql(engine, "%s" if engine == "postgresql" else self.placeholders)
+
+        # Throughput counters
+        self.started_at = time.monotonic()
+        self.total_rows = 0
+        self.total_batches = 0
+        self.failed_rows = 0
+        self.write_seconds = 0.0
+        self.window_started_at = self.started_at
+        self.window_rows = 0
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def _touch(self):
+        if self.first_row_at is None:
+            self.first_row_at = time.monotonic()
+
+    def add(self, row):
+        """Queue a position row, ordered as POSITION_COLUMNS."""
+        self._touch()
+        self.buffer.append(row)
+
+    def update_latest(self, row):
+        """Queue the newest fix of a ship, ordered as POSITION_COLUMNS."""
+        self._touch()
+        self.latest[row[0]] = row
+
+    def upsert_vessel(self, mmsi, details, updated_at):
+        self._touch()
+        self.vessels[mmsi] = (mmsi,) + tuple(details.get(col) for col in VESSEL_COLUMNS[1:-1]) + (updated_at,)
+
+    def due(self):
+        if self.spool is not None and self.spool.pending and time.monotonic() >= self.next_drain_at:
+            return True
+        if self.first_row_at is None:
+            return False
+        return (len(self.buffer) >= self.max_rows
+                or time.monotonic() - self.first_row_at >= self.max_delay)
+
+    def flush(self):
+        """Write the buffered batch, or spool it behind earlier ones, then drain some of the spool."""
+        taken = 0
+        if self.first_row_at is not None:
+            rows, self.buffer = self.buffer, []
+            vessels, self.vessels = list(self.vessels.values()), {}
+            latest, self.latest = list(self.latest.values()), {}
+            self.first_row_at = None
+            taken = len(rows)
+
+            if self.spool is not None and self.spool.pending:
+                # Keep the order: new batches queue up behind the spooled ones
+                self.spool.append(rows, latest, vessels)
+            else:
+                try:
+                    self._write(rows, latest, vessels)
+                except self.transient_errors:
+                    if self.spool is None:
+                        self.failed_rows += len(rows)
+                    else:
+                        self.spool.append(rows, latest, vessels)
+                    raise
+                except Exception:
+                    self.failed_rows += len(rows)
+                    raise
+
+        if self.spool is not None and self.spool.pending and time.monotonic() >= self.next_drain_at:
+            self.drain()
+        return taken
+
+    def drain(self):
+        """
+        Write spooled batches oldest first, in chunks, for up to
+        `drain_budget` seconds. Returns the rows written.
+        """
+        started = time.monotonic()
+        written = 0
+        max_rows = self.drain_rows
+        try:
+            while self.spool.pending and time.monotonic() - started < self.drain_budget:
+                rows, latest, vessels, batches = self.spool.peek(max_rows)
+                try:
+                    self._write(rows, latest, vessels)
+                except self.transient_errors:
+                    raise
+                except Exception:
+                    if batches > 1:
+                        # Find the bad batch: retry one batch at a time
+                        max_rows = 0
+                        continue
+                    self.failed_rows += len(rows)
+                    self.spool.discard(batches, len(rows))
+                    raise
+                self.spool.consume(batches, len(rows))
+                written += len(rows)
+        finally:
+            self.next_drain_at = time.monotonic() + self.max_delay
+        return written
+
+    def _write(self, rows, latest, vessels):
+        started = time.monotonic()
+        try:
+            # A fresh cursor per batch, so a reconnected connection is picked up
+            cursor = self.conn.cursor()
+            if vessels:
+                cursor.executemany(self.upsert_sql, vessels)
+            if rows:
+                self._insert(cursor, rows)
+            if latest:
+                self._upsert_latest(cursor, latest)
+            if self.notifier is not None:
+                self.notifier.stage(cursor, latest, vessels)
+            self.conn.commit()
+            cursor.close()
+        except Exception:
+            if self.notifier is not None:
+                self.notifier.discard()
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            raise
+
+        if self.notifier is not None:
+            self.notifier.commit()
+        self.write_seconds += time.monotonic() - started
+        self.total_rows += len(rows)
+        self.total_batches += 1
+        self.window_rows += len(rows)
+
+    def _insert(self, cursor, rows):
+        if self.engine == "postgresql":
+            from psycopg2.extras import execute_values
+            execute_values(cursor, INSERT_SQL.format(columns=self.columns, values="%s"),
+                           rows, page_size=len(rows))
+        else:
+            cursor.executemany(
+                INSERT_SQL.format(columns=self.columns, values=self.placeholders), rows)
+
+    def _upsert_latest(self, cursor, rows):
+        if self.engine == "postgresql":
+            from psycopg2.extras import execute_values
+            execute_values(cursor, self.latest_sql, rows, page_size=len(rows))
+        else:
+            cursor.executemany(self.latest_sql, rows)
+
+    # ------- Throughput Reporting -------
+    def window_rate(self):
+        """(rows/s written, seconds) since the previous call or report, and start a new window."""
+        now = time.monotonic()
+        window = now - self.window_started_at
+        rate = self.window_rows / window if window > 0 else 0.0
+        self.window_started_at = now
+        self.window_rows = 0
+        return rate, window
+
+    def report(self):
+        rate, window = self.window_rate()
+        capacity = self.total_rows / self.write_seconds if self.write_seconds > 0 else 0.0
+        avg_batch = self.total_rows / self.total_batches if self.total_batches else 0.0
+
+        summary = (f"DB writes: {rate:.1f} rows/s over last {window:.0f}s | "
+                   f"{self.total_rows} rows in {self.total_batches} batches (avg {avg_batch:.1f}) | "
+                   f"write capacity {capacity:.0f} rows/s | failed {self.failed_rows}")
+        if self.spool is not None:
+            summary += f" | {self.spool.report()}"
+        return summary
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.spool is not None:
+                self.spool.close()
@@ -0,0 +1,58 @@
+import time
+from collections import Counter, OrderedDict
+
+DEFAULT_WINDOW = 10.0           # seconds; must stay under 60 for message keys, the AIS second wraps every minute
+DEFAULT_MAX_ENTRIES = 50000
+
+def payload_key(sentences):
+    """Key on the armoured payload, so the same burst heard on two antennas matches."""
+    return hash("".join(sentence.split(",")[5] for sentence in sentences))
+
+def message_key(mmsi, msg_type, second):
+    return (mmsi, msg_type, second)
+
+class Deduplicator:
+    """
+    Suppresses copies of an AIS message that arrive again within `window`
+    seconds, e.g. from overlapping receivers. Keys live in an insertion
+    ordered dict that is trimmed by age and capped at `max_entries`, so
+    memory stays bounded on a busy feed.
+    """
+    def __init__(self, window=DEFAULT_WINDOW, max_entries=DEFAULT_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self.seen = OrderedDict()       # key -> time first seen
+        self.received = Counter()       # tag -> messages checked
+        self.suppressed = Counter()     # tag -> duplicates dropped
+
+    def __len__(self):
+        return len(self.seen)
+
+    def is_duplicate(self, key, tag, now=None):
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        self.received[tag] += 1
+
+        if key in self.seen:
+            self.suppressed[tag] += 1
+            return True
+
+        self.seen[key] = now
+        if len(self.seen) > self.max_entries:
+            self.seen.popitem(last=False)
+        return False
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self.seen:
+            key, first_seen = next(iter(self.seen.items()))
+            if first_seen >= cutoff:
+                return
+            del self.seen[key]
+
+    def report(self):
+        parts = []
+        for tag, received in self.received.most_common():
+            suppressed = self.suppressed[tag]
+            parts.append(f"{tag}: {suppressed}/{received} suppressed ({100.0 * suppressed / received:.1f}%)")
+        return " | ".join(parts) or "nothing received"
@@ -0,0 +1,64 @@
+import math
+import time
+
+EARTH_RADIUS = 6371000.0        # metres
+DEFAULT_MIN_DISTANCE = 50.0     # metres moved since the last stored fix
+DEFAULT_MIN_TURN = 10.0         # degrees of course change since the last stored fix
+DEFAULT_MAX_SILENCE = 180.0     # seconds without a stored fix
+STATE_MAX_AGE = 3600.0          # forget ships not heard for this long
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Equirectangular approximation, accurate to well under 1% over a few kilometres."""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS * math.hypot(x, y)
+
+def course_change(course1, course2):
+    # pyais reports 360 (or more) when course over ground is not available
+    if course1 is None or course2 is None or course1 >= 360 or course2 >= 360:
+        return 0.0
+    diff = abs(course1 - course2) % 360
+    return min(diff, 360 - diff)
+
+class MovementFilter:
+    """
+    Per-vessel write policy: a position is stored only if the ship moved
+    more than `min_distance` metres, turned more than `min_turn` degrees,
+    or has had nothing stored for `max_silence` seconds. Comparisons are
+    against the last stored fix, so slow drift still adds up to a new row.
+    """
+    def __init__(self, min_distance=DEFAULT_MIN_DISTANCE, min_turn=DEFAULT_MIN_TURN,
+                 max_silence=DEFAULT_MAX_SILENCE):
+        self.min_distance = min_distance
+        self.min_turn = min_turn
+        self.max_silence = max_silence
+        self.last = {}              # mmsi -> (lat, lon, course, stored_at)
+        self.stored = 0
+        self.skipped = 0
+
+    def should_store(self, mmsi, lat, lon, course, now=None):
+        now = time.monotonic() if now is None else now
+        last = self.last.get(mmsi)
+
+        if last is not None:
+            last_lat, last_lon, last_course, stored_at = last
+            if (now - stored_at < self.max_silence
+                    and distance_m(last_lat, last_lon, lat, lon) < self.min_distance
+                    and course_change(last_course, course) < self.min_turn):
+                self.skipped += 1
+                return False
+
+        self.last[mmsi] = (lat, lon, course, now)
+        self.stored += 1
+        return True
+
+    def prune(self, now=None, max_age=STATE_MAX_AGE):
+        now = time.monotonic() if now is None else now
+        for mmsi in [mmsi for mmsi, state in self.last.items() if now - state[3] > max_age]:
+            del self.last[mmsi]
+
+    def report(self):
+        total = self.stored + self.skipped
+        ratio = 100.0 * self.skipped / total if total else 0.0
+        return (f"{self.stored} stored, {self.skipped} skipped ({ratio:.1f}% reduction), "
+                f"{len(self.last)} ships tracked")
@@ -0,0 +1,89 @@
+import time
+import queue
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 256
+DEFAULT_RATE_PER_HOST = 1.0     # requests per second to any single host
+
+# ------- Rate Limiting -------
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host so a burst of new ships does not
+    hammer VesselFinder. Thread safe; callers sleep until their slot.
+    """
+    def __init__(self, rate_per_host=DEFAULT_RATE_PER_HOST):
+        self.interval = 1.0 / rate_per_host if rate_per_host > 0 else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, 0.0))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class RateLimitedSession(requests.Session):
+    """requests.Session shared by all workers, keeping connections alive per host."""
+    def __init__(self, limiter, pool_size=DEFAULT_WORKERS):
+        super().__init__()
+        self.limiter = limiter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        self.limiter.wait(urlparse(url).hostname)
+        return super().request(method, url, *args, **kwargs)
+
+# ------- Worker Pool -------
+class EnrichmentPool:
+    """
+    Runs ship lookups on a bounded thread pool so the read loop never waits
+    on HTTP. Finished lookups are collected with drain() from the main thread,
+    which is the only thread that touches the cache and the database.
+    """
+    def __init__(self, lookup, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self.lookup = lookup
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+        self.pending = {}               # mmsi -> time the lookup was submitted
+        self.results = queue.Queue()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(self, mmsi):
+        if mmsi in self.pending or len(self.pending) >= self.max_pending:
+            return False
+        self.pending[mmsi] = time.time()
+        self.executor.submit(self._run, mmsi)
+        return True
+
+    def _run(self, mmsi):
+        try:
+            self.results.put((mmsi, self.lookup(mmsi), None))
+        except Exception as err:
+            self.results.put((mmsi, None, err))
+
+    def drain(self):
+        """Yield (mmsi, details, error, submitted_at) for every finished lookup."""
+        while True:
+            try:
+                mmsi, details, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            submitted_at = self.pending.pop(mmsi, None)
+            yield mmsi, details, error, submitted_at
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
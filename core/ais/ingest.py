@@ -0,0 +1,250 @@
+import time
+import queue
+import asyncio
+import threading
+
+DEFAULT_QUEUE_SIZE = 10000
+RECONNECT_DELAY = 5.0           # seconds between TCP client reconnect attempts
+GET_TIMEOUT = 0.5               # longest the receiver waits for a line before doing housekeeping
+# A dropped link, or a line over the stream limit without a newline (readline raises ValueError)
+STREAM_ERRORS = (OSError, asyncio.IncompleteReadError, ValueError)
+
+class SourceStats:
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.dropped = 0        # lines lost because the pipeline queue was full
+        self.errors = 0         # connection and read errors
+        self.connections = 0
+
+    def __str__(self):
+        return (f"{self.lines} lines, {self.bytes} bytes, {self.dropped} dropped, "
+                f"{self.errors} errors, {self.connections} connections")
+
+# ------- Sources -------
+class ThreadedSource:
+    """
+    Runs a blocking source (SerialSource, ReplaySource) on its own thread.
+    Lines are put on the pipeline queue with blocking, so a fast replay is
+    throttled by the pipeline instead of dropping sentences.
+    """
+    def __init__(self, tag, source):
+        self.tag = tag
+        self.source = source
+        self.stats = SourceStats()
+        self.stopping = False
+
+    def __str__(self):
+        return f"[{self.tag}] {self.source}"
+
+    async def run(self, emit):
+        self.stats.connections += 1
+        await asyncio.to_thread(self._pump, emit)
+
+    def _pump(self, emit):
+        while not self.stopping:
+            line = self.source.readline()
+            if line is None:
+                return
+            if line:
+                self.stats.bytes += len(line)
+                emit(self, line, block=True)
+
+    def close(self):
+        self.stopping = True
+        self.source.close()
+
+class TCPClientSource:
+    """Connects to a networked receiver or aggregator and reconnects when the link drops."""
+    def __init__(self, tag, host, port, reconnect_delay=RECONNECT_DELAY):
+        self.tag = tag
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self.stats = SourceStats()
+
+    def __str__(self):
+        return f"[{self.tag}] TCP client to {self.host}:{self.port}"
+
+    async def run(self, emit):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                self.stats.errors += 1
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self.stats.connections += 1
+            try:
+                await _read_lines(self, reader, emit)
+            except STREAM_ERRORS:
+                self.stats.errors += 1
+            finally:
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def close(self):
+        pass
+
+class TCPServerSource:
+    """Accepts TCP connections from receivers that push NMEA to us."""
+    def __init__(self, tag, host, port):
+        self.tag = tag
+        self.host = host
+        self.port = port
+        self.stats = SourceStats()
+        self.server = None
+
+    def __str__(self):
+        return f"[{self.tag}] TCP server on {self.host}:{self.port}"
+
+    async def run(self, emit):
+        async def handle_client(reader, writer):
+            self.stats.connections += 1
+            try:
+                await _read_lines(self, reader, emit)
+            except STREAM_ERRORS:
+                self.stats.errors += 1
+            finally:
+                writer.close()
+
+        self.server = await asyncio.start_server(handle_client, self.host, self.port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+class UDPSource:
+    """Listens for NMEA datagrams, each holding one or more sentences."""
+    def __init__(self, tag, host, port):
+        self.tag = tag
+        self.host = host
+        self.port = port
+        self.stats = SourceStats()
+        self.transport = None
+
+    def __str__(self):
+        return f"[{self.tag}] UDP listener on {self.host}:{self.port}"
+
+    async def run(self, emit):
+        source = self
+
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                source.stats.bytes += len(data)
+                for line in data.decode("ascii", errors="replace").splitlines():
+                    line = line.strip()
+                    if line:
+                        emit(source, line)
+
+            def error_received(self, exc):
+                source.stats.errors += 1
+
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            Protocol, local_addr=(self.host, self.port))
+        self.stats.connections += 1
+        await asyncio.Event().wait()        # run until cancelled
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+async def _read_lines(source, reader, emit):
+    while True:
+        raw = await reader.readline()
+        if not raw:
+            return
+        source.stats.bytes += len(raw)
+        line = raw.decode("ascii", errors="replace").strip()
+        if line:
+            emit(source, line)
+
+# ------- Hub -------
+class IngestHub:
+    """
+    Multiplexes several NMEA sources on one asyncio loop (in a background
+    thread) into a single queue that the receiver's decode pipeline reads
+    with get(). Every line comes out tagged with the source it arrived on.
+    """
+    def __init__(self, sources, queue_size=DEFAULT_QUEUE_SIZE):
+        self.sources = sources
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.loop = None
+        self.thread = None
+        self.tasks = []
+        self.running = 0
+
+    def __str__(self):
+        return ", ".join(str(source) for source in self.sources)
+
+    def start(self):
+        ready = threading.Event()
+        self.running = len(self.sources)
+        self.thread = threading.Thread(target=self._run_loop, args=(ready,), name="ingest", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.tasks = [self.loop.create_task(self._run_source(source)) for source in self.sources]
+        ready.set()
+        self.loop.run_until_complete(asyncio.gather(*self.tasks, return_exceptions=True))
+        self.loop.close()
+
+    async def _run_source(self, source):
+        try:
+            await source.run(self._emit)
+        except asyncio.CancelledError:
+            pass
+        except Exception as err:
+            source.stats.errors += 1
+            print(f"Input {source} stopped: {err}")
+        finally:
+            self.running -= 1
+
+    def _emit(self, source, line, block=False):
+        source.stats.lines += 1
+        if block:
+            while True:
+                try:
+                    self.queue.put((source.tag, line, time.monotonic()), timeout=GET_TIMEOUT)
+                    return
+                except queue.Full:
+                    if getattr(source, "stopping", False):
+                        source.stats.dropped += 1
+                        return
+        try:
+            self.queue.put_nowait((source.tag, line, time.monotonic()))
+        except queue.Full:
+            source.stats.dropped += 1
+
+    def get(self, timeout=GET_TIMEOUT):
+        """Next (tag, line, read_at), or None if nothing arrived within `timeout`. read_at is time.monotonic()."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    @property
+    def finished(self):
+        return self.running == 0 and self.queue.empty()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def report(self):
+        return " | ".join(f"{source.tag}: {source.stats}" for source in self.sources)
+
+    def stop(self):
+        for source in self.sources:
+            source.close()
+        if self.loop is not None and not self.loop.is_closed():
+            for task in self.tasks:
+                self.loop.call_soon_threadsafe(task.cancel)
+        if self.thread is not None:
+            self.thread.join(timeout=2)
@@ -0,0 +1,223 @@
+import os
+import time
+import tempfile
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SHM_NAME = "maritime_live_fleet"    # prefix; every receiver run creates its own segment
+POINTER_PATH = os.path.join(tempfile.gettempdir(), "maritime_live_fleet.name")   # current segment name
+CAPACITY = 4096                 # vessels kept; the longest silent one is evicted when full
+STALE_AFTER = 10.0              # seconds without a writer heartbeat before readers detach
+HEADER_BYTES = 64
+
+# Header words: seqlock counter (odd while writing), rows used, capacity, heartbeat (ms since epoch)
+SEQ, COUNT, SLOTS, HEARTBEAT = range(4)
+
+RECORD_DTYPE = np.dtype([
+    ("mmsi", np.int64),
+    ("version", np.uint64),             # seqlock counter of the last write to this row
+    ("updated", np.float64),            # time.time() of the last write to this row, for expiry
+    ("timestamp", np.float64),          # time of the last position fix, 0 if none yet
+    ("latitude", np.float64),
+    ("longitude", np.float64),
+    ("speed", np.float32),              # NaN when not available
+    ("course", np.float32),
+    ("heading", np.int16),              # -1 when not available
+    ("name", "S64"),
+    ("image_path", "S256"),
+    ("navigation_status", "S48"),
+    ("destination", "S64"),
+    ("eta", "S32"),
+])
+TEXT_FIELDS = ("name", "image_path", "navigation_status", "destination", "eta")
+NO_CHANGES = np.empty(0, dtype=RECORD_DTYPE)
+
+def _encode(value, field):
+    return (value or "").encode("utf-8")[:RECORD_DTYPE[field].itemsize]
+
+def _decode(value):
+    return value.decode("utf-8", "ignore") or None
+
+def _views(buf, capacity):
+    header = np.ndarray((4,), dtype=np.uint64, buffer=buf)
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=buf, offset=HEADER_BYTES)
+    return header, records
+
+# ------- Receiver Side -------
+class LiveFleetWriter:
+    """
+    Publishes the latest state of every vessel into a fixed-capacity
+    structured array in shared memory. A single writer bumps the seqlock
+    counter to odd before changing rows and back to even afterwards, so
+    readers can tell a torn read from a consistent one without locks.
+
+    Each run gets a new segment name, published in POINTER_PATH. A display
+    still mapping the previous run's segment keeps it alive on Windows,
+    where unlink does nothing, so reusing one fixed name would fail.
+    """
+    def __init__(self, prefix=SHM_NAME, capacity=CAPACITY, pointer_path=POINTER_PATH):
+        size = HEADER_BYTES + capacity * RECORD_DTYPE.itemsize
+        self.name = f"{prefix}_{os.getpid()}_{int(time.time() * 1000) % 10**9}"
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self.header, self.records = _views(self.shm.buf, capacity)
+        self.header[:] = 0
+        self.header[SLOTS] = capacity
+        self.capacity = capacity
+        self.slots = {}                 # mmsi -> row index
+        self.evicted = 0
+        self.heartbeat()
+
+        self.pointer_path = pointer_path
+        temp_path = f"{pointer_path}.{os.getpid()}"
+        with open(temp_path, "w", encoding="ascii") as f:
+            f.write(self.name)
+        os.replace(temp_path, pointer_path)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _begin(self):
+        self.header[SEQ] += 1
+
+    def _end(self):
+        self.header[SEQ] += 1
+
+    def _slot(self, mmsi):
+        slot = self.slots.get(mmsi)
+        if slot is not None:
+            return slot
+        count = len(self.slots)
+        if count >= self.capacity:
+            slot = int(np.argmin(self.records["updated"][:count]))
+            del self.slots[int(self.records[slot]["mmsi"])]
+            self.evicted += 1
+        else:
+            slot = count
+            self.header[COUNT] = count + 1
+        self.records[slot] = np.zeros((), dtype=RECORD_DTYPE)
+        self.records[slot]["mmsi"] = mmsi
+        self.records[slot]["heading"] = -1
+        self.records[slot]["speed"] = np.nan
+        self.records[slot]["course"] = np.nan
+        self.slots[mmsi] = slot
+        return slot
+
+    def update_position(self, mmsi, lat, lon, speed=None, course=None, heading=None, timestamp=None):
+        now = time.time()
+        self._begin()
+        try:
+            row = self.records[self._slot(mmsi)]
+            row["timestamp"] = timestamp or now
+            row["latitude"] = lat
+            row["longitude"] = lon
+            row["speed"] = np.nan if speed is None else speed
+            row["course"] = np.nan if course is None else course
+            row["heading"] = -1 if heading is None else heading
+            row["updated"] = now
+            row["version"] = self.header[SEQ]
+        finally:
+            self._end()
+
+    def update_details(self, mmsi, details):
+        """Store the non-empty values of a ship details dict (see ship_cache.DETAIL_FIELDS)."""
+        self._begin()
+        try:
+            row = self.records[self._slot(mmsi)]
+            for field in TEXT_FIELDS:
+                if details.get(field):
+                    row[field] = _encode(details[field], field)
+            row["updated"] = time.time()
+            row["version"] = self.header[SEQ]
+        finally:
+            self._end()
+
+    def expire(self, max_age):
+        """Drop vessels without a fix for `max_age` seconds, moving the last rows into the gaps."""
+        cutoff = time.time() - max_age
+        stale = [mmsi for mmsi, slot in self.slots.items() if self.records[slot]["updated"] < cutoff]
+        if not stale:
+            return 0
+        self._begin()
+        try:
+            for mmsi in stale:
+                slot = self.slots.pop(mmsi)
+                last = len(self.slots)
+                if slot != last:
+                    self.records[slot] = self.records[last]
+                    self.slots[int(self.records[slot]["mmsi"])] = slot
+                self.header[COUNT] = last
+        finally:
+            self._end()
+        return len(stale)
+
+    def heartbeat(self):
+        self.header[HEARTBEAT] = int(time.time() * 1000)
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+        self.shm.unlink()
+        try:
+            if current_segment(self.pointer_path) == self.name:
+                os.remove(self.pointer_path)
+        except OSError:
+            pass
+
+def current_segment(pointer_path=POINTER_PATH):
+    """Name of the segment the running receiver publishes; FileNotFoundError when there is none."""
+    with open(pointer_path, "r", encoding="ascii") as f:
+        return f.read().strip()
+
+# ------- Display Side -------
+class LiveFleetReader:
+    """
+    Maps the receiver's live fleet buffer. `read()` returns the rows that
+    changed since the previous call, copied out under the seqlock, or an
+    empty array when nothing changed. Changes are found by the seqlock
+    counter stamped on each row, not by wall-clock time, which repeats
+    within a coarse clock tick. Raises FileNotFoundError from the
+    constructor when no receiver is publishing.
+    """
+    def __init__(self, name=None, retries=100):
+        self.name = name or current_segment()
+        self.shm = shared_memory.SharedMemory(name=self.name)
+        if os.name == "posix":
+            # Attaching registers the segment with this process's resource tracker,
+            # which would unlink it from under the receiver when the display exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        header = np.ndarray((4,), dtype=np.uint64, buffer=self.shm.buf)
+        self.header, self.records = _views(self.shm.buf, int(header[SLOTS]))
+        self.retries = retries
+        self.last_seq = None
+        self.torn_reads = 0
+
+    @property
+    def stale(self):
+        return time.time() - int(self.header[HEARTBEAT]) / 1000.0 > STALE_AFTER
+
+    def read(self):
+        for _ in range(self.retries):
+            seq = int(self.header[SEQ])
+            if seq == self.last_seq:
+                return NO_CHANGES
+            if seq % 2:
+                continue                # writer is mid-update
+            count = int(self.header[COUNT])
+            records = self.records[:count]
+            # Every row written since the last consistent read carries a higher (odd) counter value
+            changed = records[records["version"] > (self.last_seq or 0)]
+            if int(self.header[SEQ]) == seq:
+                self.last_seq = seq
+                return changed
+            self.torn_reads += 1
+        return NO_CHANGES
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+
+def record_details(record):
+    """The text fields of a record as a ship details dict."""
+    return {field: _decode(record[field]) for field in TEXT_FIELDS}
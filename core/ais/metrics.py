@@ -0,0 +1,161 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+# Seconds; from sub-millisecond decode times up to slow web lookups
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(label_name, label):
+    return f'{{{label_name}="{label}"}}' if label_name else ""
+
+def _number(value):
+    return "+Inf" if value == float("inf") else f"{value:g}" if isinstance(value, float) else str(value)
+
+# ------- Metric Types -------
+class Counter:
+    """Monotonic count, optionally split by one label."""
+    kind = "counter"
+
+    def __init__(self, name, help, label_name=None):
+        self.name = name
+        self.help = help
+        self.label_name = label_name
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, label=""):
+        try:
+            self.values[label] += amount
+        except KeyError:
+            # New labels are added under the lock so a scrape never sees the dict resize
+            with self.lock:
+                self.values[label] = self.values.get(label, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [(self.name, _labels(self.label_name, label), value) for label, value in items]
+
+class Collected:
+    """Counter or gauge whose values are read from the pipeline at scrape time."""
+    def __init__(self, name, help, kind, collect, label_name=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.collect = collect      # () -> number, or {label: number} with label_name
+        self.label_name = label_name
+
+    def samples(self):
+        values = self.collect()
+        if self.label_name is None:
+            return [(self.name, "", values)]
+        return [(self.name, _labels(self.label_name, label), value) for label, value in list(values.items())]
+
+class Histogram:
+    """Latency distribution over fixed buckets, in seconds."""
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, None before any observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        counts = list(self.counts)
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", f'{{le="{_number(bound)}"}}', cumulative))
+        samples.append((f"{self.name}_sum", "", self.sum))
+        samples.append((f"{self.name}_count", "", cumulative))
+        return samples
+
+# ------- Registry -------
+class Metrics:
+    """The receiver's metrics, rendered in the Prometheus text format."""
+    def __init__(self, prefix="ais_"):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, label_name=None):
+        return self._add(Counter(self.prefix + name, help, label_name))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help, buckets))
+
+    def collected(self, name, help, kind, collect, label_name=None):
+        return self._add(Collected(self.prefix + name, help, kind, collect, label_name))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+# ------- HTTP Endpoint -------
+class MetricsServer:
+    """Serves GET /metrics from a daemon thread."""
+    def __init__(self, metrics, host=METRICS_HOST, port=METRICS_PORT):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass            # scrapes would flood the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def __str__(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "ship_cache.json")
+DEFAULT_TTL = 6 * 60 * 60          # seconds before a vessel is looked up again
+DEFAULT_MAX_ENTRIES = 5000
+
+DETAIL_FIELDS = ("name", "image_path", "navigation_status", "destination", "eta")
+
+class ShipCache:
+    """
+    LRU cache of scraped vessel details keyed by MMSI.
+
+    Entries older than `ttl` seconds count as expired, so the receiver only
+    enriches a ship on a miss or after expiry. The cache is saved as JSON so
+    it survives receiver restarts.
+    """
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # mmsi -> {"fetched_at": epoch seconds, "details": {...}}
+        self.dirty = False
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, mmsi, allow_expired=False):
+        entry = self.entries.get(mmsi)
+        if entry is None:
+            return None
+        if not allow_expired and self.is_expired(entry):
+            return None
+        self.entries.move_to_end(mmsi)
+        return entry["details"]
+
+    def is_expired(self, entry, now=None):
+        now = time.time() if now is None else now
+        return now - entry["fetched_at"] > self.ttl
+
+    def put(self, mmsi, details, fetched_at=None):
+        details = {field: details.get(field) for field in DETAIL_FIELDS}
+        self.entries[mmsi] = {
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "details": details,
+        }
+        self.entries.move_to_end(mmsi)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+        return details
+
+    def update(self, mmsi, fields):
+        """Merge the non-empty fields into an entry without renewing its TTL."""
+        entry = self.entries.get(mmsi)
+        if entry is None:
+            # fetched_at 0 keeps the entry expired, so the ship is still looked up
+            return self.put(mmsi, fields, fetched_at=0)
+
+        for field in DETAIL_FIELDS:
+            if fields.get(field):
+                entry["details"][field] = fields[field]
+        self.entries.move_to_end(mmsi)
+        self.dirty = True
+        return entry["details"]
+
+    def defer(self, mmsi, retry_after):
+        """
+        Record a failed lookup: keep the entry's details but let it expire in
+        `retry_after` seconds, so the ship is not looked up on every report.
+        """
+        entry = self.entries.get(mmsi)
+        details = entry["details"] if entry is not None else {}
+        return self.put(mmsi, details, fetched_at=time.time() - self.ttl + retry_after)
+
+    # ------- Persistence -------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print("Ship cache file is unreadable, starting with an empty cache.")
+            return
+
+        # Entries are saved least recently used first, so the order survives a restart
+        for mmsi, entry in data.items():
+            self.entries[int(mmsi)] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({str(mmsi): entry for mmsi, entry in self.entries.items()}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
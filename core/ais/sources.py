@@ -0,0 +1,124 @@
+import re
+import time
+from datetime import datetime
+
+import serial
+
+IDLE_SLICE = 0.5        # longest a source blocks before returning "" so the receiver can do housekeeping
+
+# NMEA 4.0 tag block, e.g. "\s:rcv1,c:1700000000*5A\!AIVDM,..." where c: is unix time
+TAG_BLOCK_RE = re.compile(r"^\\([^\\]*)\\")
+
+class SerialSource:
+    """Live NMEA from an AIS receiver on a serial port."""
+    def __init__(self, port, baud_rate, timeout=IDLE_SLICE):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.ser = serial.Serial(port, baud_rate, timeout=timeout)
+
+    def __str__(self):
+        return f"{self.port} @ {self.baud_rate} baud"
+
+    def readline(self):
+        """Return one sentence, "" if nothing arrived before the timeout."""
+        return self.ser.readline().decode("ascii", errors="replace").strip()
+
+    def close(self):
+        self.ser.close()
+
+class ReplaySource:
+    """
+    Replays a recorded NMEA log file.
+
+    Lines may carry a receive time as a leading unix timestamp or ISO date
+    ("1700000000.25 !AIVDM,...", "2024-05-01T12:00:00 !AIVDM,...") or as
+    the c: field of an NMEA tag block. Timestamped lines are paced at
+    `speed` times real time; speed 0 plays as fast as possible, which is
+    what the ingest benchmark uses. Lines without a timestamp follow the
+    previous line immediately.
+    """
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.file = open(path, "r", encoding="ascii", errors="replace")
+        self.first_log_time = None
+        self.first_wall_time = None
+        self.pending = None         # (sentence, due wall time) still waiting for its slot
+        self.lines = 0
+
+    def __str__(self):
+        mode = "as fast as possible" if not self.speed else f"{self.speed:g}x real time"
+        return f"replay of {self.path} ({mode})"
+
+    def readline(self):
+        """Return one sentence, "" while waiting for the next slot, None at end of file."""
+        if self.pending is None:
+            raw = self.file.readline()
+            if not raw:
+                return None
+            sentence, log_time = parse_log_line(raw)
+            self.pending = (sentence, self._due(log_time))
+
+        sentence, due = self.pending
+        if due is not None:
+            wait = due - time.monotonic()
+            if wait > IDLE_SLICE:
+                time.sleep(IDLE_SLICE)
+                return ""
+            if wait > 0:
+                time.sleep(wait)
+
+        self.pending = None
+        self.lines += 1
+        return sentence
+
+    def _due(self, log_time):
+        if not self.speed or log_time is None:
+            return None
+        if self.first_log_time is None:
+            self.first_log_time = log_time
+            self.first_wall_time = time.monotonic()
+        return self.first_wall_time + (log_time - self.first_log_time) / self.speed
+
+    def close(self):
+        self.file.close()
+
+# ------- Log Line Parsing -------
+def parse_log_line(raw):
+    """Split a recorded line into (sentence, unix time or None)."""
+    line = raw.strip()
+    log_time = None
+
+    tag = TAG_BLOCK_RE.match(line)
+    if tag:
+        line = line[tag.end():]
+        for field in tag.group(1).split("*")[0].split(","):
+            if field.startswith("c:"):
+                log_time = _parse_time(field[2:])
+
+    start = _sentence_start(line)
+    if start > 0:
+        prefix = line[:start].strip(" \t,;")
+        line = line[start:]
+        if log_time is None:
+            log_time = _parse_time(prefix)
+
+    return line, log_time
+
+def _sentence_start(line):
+    positions = [i for i in (line.find("!"), line.find("$")) if i >= 0]
+    return min(positions) if positions else 0
+
+def _parse_time(text):
+    if not text:
+        return None
+    try:
+        value = float(text)
+        # c: fields are sometimes in milliseconds
+        return value / 1000.0 if value > 1e11 else value
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
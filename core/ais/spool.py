@@ -0,0 +1,182 @@
+import os
+import json
+import time
+
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 1.0        # seconds between fsyncs while appending
+SEGMENT_PREFIX = "segment-"
+
+def _merge_latest(latest, row):
+    # One row per ship: a multi-row upsert may not touch the same key twice
+    known = latest.get(row[0])
+    if known is None or str(row[1]) >= str(known[1]):
+        latest[row[0]] = row
+
+def _merge_vessel(vessels, row):
+    known = vessels.get(row[0])
+    vessels[row[0]] = row if known is None else tuple(
+        new if new is not None else old for new, old in zip(row, known))
+
+class Spool:
+    """
+    Append-only local spool for batches the database could not take.
+    Each batch is one NDJSON line {"p": positions, "l": latest, "v": vessels}
+    in numbered segment files. Appends are fsynced at most every
+    `fsync_interval` seconds; when the spool grows past `max_bytes` the
+    oldest segment is dropped. Batches are read back oldest first and a
+    segment is deleted once all of it has been written.
+
+    Delivery is at least once: rows of a partly drained segment are written
+    again if the receiver restarts before the segment is finished.
+    """
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, max_bytes=DEFAULT_MAX_BYTES,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.segments = []          # [path, bytes, rows, batches], oldest first
+        self.active = None          # file object of the newest segment, if still open
+        self.next_number = 0
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+        self.head = None            # batches of the oldest segment while it is drained
+        self.head_offset = 0
+        self.spooled_rows = 0
+        self.drained_rows = 0
+        self.dropped_rows = 0
+        self._restore()
+
+    def _restore(self):
+        """Pick up the segments a previous run left behind."""
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith(SEGMENT_PREFIX))
+        for name in names:
+            path = os.path.join(self.directory, name)
+            batches = self._load(path)
+            if not batches:
+                os.remove(path)
+                continue
+            self.segments.append([path, os.path.getsize(path), sum(len(b[0]) for b in batches), len(batches)])
+            self.next_number = max(self.next_number, int(name[len(SEGMENT_PREFIX):].split(".")[0]) + 1)
+
+    @property
+    def pending(self):
+        """Batches waiting to be written."""
+        return sum(segment[3] for segment in self.segments) - self.head_offset
+
+    @property
+    def pending_rows(self):
+        return sum(segment[2] for segment in self.segments)
+
+    @property
+    def size(self):
+        return sum(segment[1] for segment in self.segments)
+
+    # ------- Appending -------
+    def _roll(self):
+        self._seal()
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.next_number:08d}.ndjson")
+        self.next_number += 1
+        self.active = open(path, "a", encoding="utf-8")
+        self.segments.append([path, 0, 0, 0])
+
+    def _seal(self):
+        if self.active is not None:
+            self.sync()
+            self.active.close()
+            self.active = None
+
+    def append(self, rows, latest, vessels):
+        line = json.dumps({"p": rows, "l": latest, "v": vessels}, default=str, separators=(",", ":")) + "\n"
+        if self.active is None or self.segments[-1][1] >= self.segment_bytes:
+            self._roll()
+        self.active.write(line)
+        self.unsynced = True
+        segment = self.segments[-1]
+        segment[1] += len(line.encode("utf-8"))
+        segment[2] += len(rows)
+        segment[3] += 1
+        self.spooled_rows += len(rows)
+
+        if time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self.sync()
+        self._enforce_limit()
+
+    def sync(self):
+        if self.active is not None and self.unsynced:
+            self.active.flush()
+            os.fsync(self.active.fileno())
+            self.unsynced = False
+        self.last_fsync = time.monotonic()
+
+    def _enforce_limit(self):
+        while self.size > self.max_bytes and len(self.segments) > 1:
+            path, _, rows, _ = self.segments.pop(0)
+            self.dropped_rows += rows
+            self.head, self.head_offset = None, 0
+            os.remove(path)
+            print(f"Spool full: dropped {rows} oldest rows ({os.path.basename(path)}).")
+
+    # ------- Draining -------
+    def _load(self, path):
+        batches = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue        # torn last line after a crash
+                batches.append(([tuple(row) for row in record["p"]], [tuple(row) for row in record["l"]],
+                                [tuple(row) for row in record["v"]]))
+        return batches
+
+    def peek(self, max_rows):
+        """
+        Merge the oldest spooled batches into one write of about `max_rows`
+        positions. Returns (rows, latest, vessels, batches) where `batches`
+        is the number to pass to consume() once the write is committed.
+        """
+        if self.head is None:
+            if len(self.segments) == 1:
+                self._seal()        # appends after this start a new segment
+            self.head = self._load(self.segments[0][0])
+            self.head_offset = 0
+
+        rows, latest, vessels = [], {}, {}
+        taken = 0
+        for batch_rows, batch_latest, batch_vessels in self.head[self.head_offset:]:
+            if taken and len(rows) + len(batch_rows) > max_rows:
+                break
+            rows.extend(batch_rows)
+            for row in batch_latest:
+                _merge_latest(latest, row)
+            for row in batch_vessels:
+                _merge_vessel(vessels, row)
+            taken += 1
+        return rows, list(latest.values()), list(vessels.values()), taken
+
+    def consume(self, batches, rows=0):
+        self.head_offset += batches
+        self.drained_rows += rows
+        self.segments[0][2] -= rows
+        if self.head_offset >= len(self.head):
+            path = self.segments.pop(0)[0]
+            os.remove(path)
+            self.head, self.head_offset = None, 0
+
+    def discard(self, batches, rows=0):
+        """Remove batches the database rejected for good; they count as dropped, not drained."""
+        self.consume(batches, rows)
+        self.drained_rows -= rows
+        self.dropped_rows += rows
+
+    def report(self):
+        return (f"spool: {self.pending} batches / {self.pending_rows} rows waiting "
+                f"({self.size / 1048576:.1f} MB) | spooled {self.spooled_rows}, "
+                f"drained {self.drained_rows}, dropped {self.dropped_rows}")
+
+    def close(self):
+        self._seal()
@@ -0,0 +1,273 @@
+"""
+Synthetic AIS traffic for load and soak tests: N simulated vessels sail
+between random waypoints inside the bounds of the georeferenced map and
+report checksummed !AIVDM sentences, type 1 positions plus two-part type 5
+static messages.
+
+    python core/ais/traffic_generator.py --vessels 2000 --output traffic.nmea --timestamps --duration 3600
+    python core/ais/traffic_generator.py --vessels 2000 --speed 5 --tcp-listen 10110
+    python core/ais/traffic_generator.py --vessels 500 --speed 0 --duration 600 | \\
+        python core/ais/ais_receiver.py --replay /dev/stdin --speed 0 --no-enrich
+
+--speed is a multiple of real traffic (0 writes as fast as possible);
+--timestamps prefixes lines with their unix time, so a file written fast
+can be replayed later at any pace with --replay.
+"""
+import os
+import sys
+import math
+import time
+import heapq
+import random
+import socket
+import argparse
+
+from pyais.encode import encode_dict
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+MAP_PATH = os.path.join(PROJECT_ROOT, "images", "georeferenced", "georeferenced_map.tif")
+DEFAULT_BOUNDS = (24.2, 36.3, 26.4, 38.0)   # lon_min, lat_min, lon_max, lat_max: the Cyclades
+MMSI_BASE = 237000000                       # Greek MID
+POSITION_INTERVAL = 10.0                    # seconds between position reports of a vessel under way
+MOORED_INTERVAL = 180.0                     # ...and of a moored one
+STATIC_INTERVAL = 360.0                     # seconds between type 5 reports
+MOORED_SHARE = 0.15
+MAX_TURN_RATE = 3.0                         # degrees per second
+ARRIVAL_DISTANCE = 0.01                     # degrees from a waypoint that count as arrived
+KNOT = 1852.0 / 3600.0                      # metres per second
+DESTINATIONS = ("PIRAEUS", "SYROS", "MYKONOS", "NAXOS", "PAROS", "SANTORINI", "TINOS", "ANDROS", "MILOS", "IOS")
+
+def map_bounds(path=MAP_PATH):
+    """(lon_min, lat_min, lon_max, lat_max) of the georeferenced map, or DEFAULT_BOUNDS without it."""
+    try:
+        import rasterio
+        with rasterio.open(path) as src:
+            return tuple(src.bounds)
+    except Exception:
+        return DEFAULT_BOUNDS
+
+# ------- Vessel Model -------
+class SimulatedVessel:
+    """One vessel sailing straight legs between random waypoints, turning at a limited rate."""
+    def __init__(self, index, bounds, rng):
+        self.mmsi = MMSI_BASE + index
+        self.name = f"SIM VESSEL {index}"
+        self.callsign = f"SV{index:04d}"[:7]
+        self.ship_type = rng.choice((30, 36, 37, 60, 70, 80))
+        self.destination = rng.choice(DESTINATIONS)
+        self.length = rng.randint(12, 200)
+        self.bounds = bounds
+        self.rng = rng
+
+        self.lat, self.lon = self._random_point()
+        self.moored = rng.random() < MOORED_SHARE
+        self.cruise_speed = 0.0 if self.moored else rng.uniform(6, 24)
+        self.speed = self.cruise_speed
+        self.waypoint = self._random_point()
+        self.course = self._bearing_to(self.waypoint)
+
+    def _random_point(self):
+        lon_min, lat_min, lon_max, lat_max = self.bounds
+        return self.rng.uniform(lat_min, lat_max), self.rng.uniform(lon_min, lon_max)
+
+    def _bearing_to(self, point):
+        d_lat = point[0] - self.lat
+        d_lon = (point[1] - self.lon) * math.cos(math.radians(self.lat))
+        return math.degrees(math.atan2(d_lon, d_lat)) % 360
+
+    def step(self, dt):
+        if self.moored:
+            return
+        if abs(self.waypoint[0] - self.lat) + abs(self.waypoint[1] - self.lon) < ARRIVAL_DISTANCE:
+            self.waypoint = self._random_point()
+
+        # Turn towards the waypoint no faster than MAX_TURN_RATE
+        turn = (self._bearing_to(self.waypoint) - self.course + 180) % 360 - 180
+        limit = MAX_TURN_RATE * dt
+        self.course = (self.course + max(-limit, min(limit, turn))) % 360
+        self.speed = max(0.0, self.cruise_speed + self.rng.uniform(-0.3, 0.3))
+
+        distance = self.speed * KNOT * dt
+        self.lat += distance * math.cos(math.radians(self.course)) / 111320.0
+        self.lon += distance * math.sin(math.radians(self.course)) / (111320.0 * math.cos(math.radians(self.lat)))
+        lon_min, lat_min, lon_max, lat_max = self.bounds
+        self.lat = min(max(self.lat, lat_min), lat_max)
+        self.lon = min(max(self.lon, lon_min), lon_max)
+
+    def position_report(self, second):
+        return {
+            "type": 1, "mmsi": self.mmsi, "status": 5 if self.moored else 0, "turn": 0,
+            "speed": round(self.speed, 1), "accuracy": 1, "lon": round(self.lon, 6), "lat": round(self.lat, 6),
+            "course": round(self.course, 1), "heading": int(self.course) % 360, "second": second,
+        }
+
+    def static_report(self, eta):
+        return {
+            "type": 5, "mmsi": self.mmsi, "ais_version": 0, "imo": 9000000 + self.mmsi % 1000000,
+            "callsign": self.callsign, "shipname": self.name, "ship_type": self.ship_type,
+            "to_bow": self.length * 3 // 4, "to_stern": self.length // 4, "to_port": 5, "to_starboard": 5,
+            "epfd": 1, "month": eta.tm_mon, "day": eta.tm_mday, "hour": eta.tm_hour, "minute": eta.tm_min,
+            "draught": 4.5, "destination": self.destination, "dte": 0,
+        }
+
+# ------- Traffic Schedule -------
+class TrafficGenerator:
+    """
+    Yields (simulated seconds, [sentences]) in time order. Every vessel
+    reports its position every POSITION_INTERVAL seconds (MOORED_INTERVAL
+    when moored) and its static data every STATIC_INTERVAL, with random
+    phases so the load is spread evenly.
+    """
+    def __init__(self, vessels, bounds=DEFAULT_BOUNDS, seed=1, start_time=None):
+        self.rng = random.Random(seed)
+        self.vessels = [SimulatedVessel(i, bounds, self.rng) for i in range(vessels)]
+        self.start_time = start_time or time.time()
+        self.seq_id = 0
+        self.messages = 0
+        self.sentences = 0
+        self.queue = []
+        for index, vessel in enumerate(self.vessels):
+            interval = MOORED_INTERVAL if vessel.moored else POSITION_INTERVAL
+            self.queue.append((self.rng.uniform(0, interval), index, 1, 0.0))
+            self.queue.append((self.rng.uniform(0, STATIC_INTERVAL), index, 5, 0.0))
+        heapq.heapify(self.queue)
+
+    def __iter__(self):
+        while self.queue:
+            due, index, msg_type, last = heapq.heappop(self.queue)
+            vessel = self.vessels[index]
+            channel = "AB"[self.messages % 2]
+            if msg_type == 1:
+                vessel.step(due - last)
+                sentences = encode_dict(vessel.position_report(int(self.start_time + due) % 60),
+                                        talker_id="AIVDM", radio_channel=channel)
+                interval = MOORED_INTERVAL if vessel.moored else POSITION_INTERVAL
+            else:
+                eta = time.gmtime(self.start_time + due + 6 * 3600)
+                sentences = encode_dict(vessel.static_report(eta), talker_id="AIVDM",
+                                        radio_channel=channel, seq_id=self.seq_id)
+                self.seq_id = (self.seq_id + 1) % 10
+                interval = STATIC_INTERVAL
+            heapq.heappush(self.queue, (due + interval, index, msg_type, due if msg_type == 1 else last))
+            self.messages += 1
+            self.sentences += len(sentences)
+            yield due, sentences
+
+# ------- Outputs -------
+class StreamOutput:
+    """A file, or stdout for piping into another process."""
+    def __init__(self, path):
+        self.file = sys.stdout if path == "-" else open(path, "w", encoding="ascii")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.flush()
+        if self.file is not sys.stdout:
+            self.file.close()
+
+class TCPServerOutput:
+    """Waits for one client, e.g. ais_receiver --tcp host:port, then streams to it."""
+    def __init__(self, host, port):
+        self.server = socket.create_server((host, port))
+        print(f"Waiting for a client on {host}:{port}...", file=sys.stderr)
+        self.conn, address = self.server.accept()
+        print(f"Client {address[0]}:{address[1]} connected.", file=sys.stderr)
+
+    def write(self, data):
+        self.conn.sendall(data.encode("ascii"))
+
+    def close(self):
+        self.conn.close()
+        self.server.close()
+
+class TCPClientOutput:
+    """Connects to ais_receiver --tcp-listen host:port."""
+    def __init__(self, host, port):
+        self.conn = socket.create_connection((host, port))
+
+    def write(self, data):
+        self.conn.sendall(data.encode("ascii"))
+
+    def close(self):
+        self.conn.close()
+
+class UDPOutput:
+    """Datagrams to ais_receiver --udp port, one sentence each, as AIS receivers send them."""
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, data):
+        for line in data.splitlines(keepends=True):
+            self.sock.sendto(line.encode("ascii"), self.address)
+
+    def close(self):
+        self.sock.close()
+
+def parse_address(text, default_host):
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+def open_output(args):
+    if args.tcp_listen:
+        return TCPServerOutput(*parse_address(args.tcp_listen, "127.0.0.1"))
+    if args.tcp:
+        return TCPClientOutput(*parse_address(args.tcp, "127.0.0.1"))
+    if args.udp:
+        return UDPOutput(*parse_address(args.udp, "127.0.0.1"))
+    return StreamOutput(args.output)
+
+# ------- Command Line -------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic AIS NMEA traffic.")
+    parser.add_argument("--vessels", type=int, default=2000, help="number of simulated vessels")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="multiple of real traffic, 0 for as fast as possible (default 1)")
+    parser.add_argument("--duration", type=float, help="simulated seconds to generate (default: forever)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the fleet")
+    parser.add_argument("--map", default=MAP_PATH, help="GeoTIFF whose bounds the vessels stay in")
+    parser.add_argument("--timestamps", action="store_true", help="prefix every line with its unix time")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--output", default="-", help="file to write, - for stdout (default)")
+    output.add_argument("--tcp-listen", metavar="[HOST:]PORT", help="serve the stream to one TCP client")
+    output.add_argument("--tcp", metavar="[HOST:]PORT", help="send the stream to a TCP server")
+    output.add_argument("--udp", metavar="[HOST:]PORT", help="send the stream as UDP datagrams")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    bounds = map_bounds(args.map)
+    generator = TrafficGenerator(args.vessels, bounds, seed=args.seed)
+    output = open_output(args)
+    print(f"{args.vessels} vessels in lon {bounds[0]:.3f}..{bounds[2]:.3f}, lat {bounds[1]:.3f}..{bounds[3]:.3f}",
+          file=sys.stderr)
+
+    started = time.monotonic()
+    try:
+        for due, sentences in generator:
+            if args.duration is not None and due > args.duration:
+                break
+            if args.speed:
+                ahead = started + due / args.speed - time.monotonic()
+                if ahead > 0.005:
+                    time.sleep(ahead)
+            prefix = f"{generator.start_time + due:.2f} " if args.timestamps else ""
+            output.write("".join(f"{prefix}{sentence}\n" for sentence in sentences))
+    except (KeyboardInterrupt, BrokenPipeError, ConnectionError):
+        pass
+    finally:
+        try:
+            output.close()
+        except OSError:
+            pass
+        elapsed = time.monotonic() - started
+        print(f"Sent {generator.messages} messages in {generator.sentences} sentences over {elapsed:.1f}s "
+              f"({generator.sentences / elapsed if elapsed > 0 else 0:.0f} sentences/s).", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
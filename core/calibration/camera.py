@@ -1,8 +1,15 @@
 import cv2
 import json
 import os
+import sys
 from tkinter import messagebox
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.calibration.capture import LatestFrameCapture
+
 COORDS_FILE = os.path.join(os.path.dirname(__file__), 'coordinates.json')
 RECTANGLE_TOP_LEFT = (100, 100)
 RECTANGLE_BOTTOM_RIGHT = (300, 300)
@@ -65,7 +72,8 @@ def select_rectangle(event, x, y, flags, param):
 def camera_calibration():
     global rectangle_top_left_corner, rectangle_bottom_right_corner
 
-    cap = cv2.VideoCapture(0)
+    # Same camera settings as the interactive display, so the rectangle matches its frames
+    cap = LatestFrameCapture()
 
     if not cap.isOpened():
         print("Error: No camera detected.")
@@ -95,7 +103,9 @@ def camera_calibration():
             br = rectangle_bottom_right_corner
             tl_corrected = (min(tl[0], br[0]), min(tl[1], br[1]))
             br_corrected = (max(tl[0], br[0]), max(tl[1], br[1]))
-            camera_coordinates = {"tl_corner": tl_corrected, "br_corner": br_corrected}
+            # The resolution lets the display notice when the camera mode changed since calibration
+            camera_coordinates = {"tl_corner": tl_corrected, "br_corner": br_corrected,
+                                  "resolution": cap.resolution}
             save_coordinates(camera_coordinates)
             messagebox.showinfo("Success", "Camera calibration saved.")
             break
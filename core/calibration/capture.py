@@ -0,0 +1,114 @@
+import time
+import threading
+
+import cv2
+
+# None keeps the camera's current mode, so calibrated coordinates stay valid.
+# E.g. 1280 x 720 at 30 fps with "MJPG", which reaches full frame rate at 720p
+# over USB 2 unlike raw YUYV; camera calibration must then be redone.
+CAMERA_INDEX = 0
+CAMERA_WIDTH = None
+CAMERA_HEIGHT = None
+CAMERA_FPS = None
+CAMERA_FOURCC = None
+READ_TIMEOUT = 1.0              # longest read() waits for a frame newer than the last one
+
+class LatestFrameCapture:
+    """
+    Grabs camera frames on a background thread and keeps only the newest,
+    so a slow consumer always gets the current picture instead of one
+    queued in the driver. Reads like cv2.VideoCapture.
+
+    dropped counts frames replaced before anyone read them; stale counts
+    reads that timed out and returned the previous frame again.
+    """
+    def __init__(self, index=CAMERA_INDEX, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS,
+                 fourcc=CAMERA_FOURCC):
+        self.capture = cv2.VideoCapture(index)
+        # FOURCC first: many drivers only offer the higher modes once MJPG is selected
+        if fourcc:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width and height:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.capture.set(cv2.CAP_PROP_FPS, fps)
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.condition = threading.Condition()
+        self.frame = None
+        self.timestamp = None           # time.monotonic() when the newest frame was grabbed
+        self.frame_id = 0
+        self.read_id = 0
+        self.grabbed = 0
+        self.dropped = 0
+        self.stale = 0
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        if self.capture.isOpened():
+            self.thread.start()
+        else:
+            self.stopping = True
+
+    @property
+    def resolution(self):
+        """[width, height] the camera actually delivers."""
+        return [int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+
+    def __str__(self):
+        fourcc = int(self.capture.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4))
+        return (f"{int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+                f"@ {self.capture.get(cv2.CAP_PROP_FPS):.0f} fps, {codec}")
+
+    def _run(self):
+        while not self.stopping:
+            ret, frame = self.capture.read()
+            timestamp = time.monotonic()
+            with self.condition:
+                if not ret:
+                    self.stopping = True
+                else:
+                    if self.frame_id > self.read_id:
+                        self.dropped += 1
+                    self.frame = frame
+                    self.timestamp = timestamp
+                    self.frame_id += 1
+                    self.grabbed += 1
+                self.condition.notify_all()
+
+    def isOpened(self):
+        return self.capture.isOpened() and (self.thread.is_alive() or self.frame_id > self.read_id)
+
+    def read_latest(self, timeout=READ_TIMEOUT):
+        """
+        (frame, grab time) of the newest frame, waiting up to timeout for one
+        not read before. Until the first frame arrives it waits as long as
+        the camera needs to warm up. (None, None) once the camera stops.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_id > self.read_id or self.stopping, timeout)
+            while self.frame is None and not self.stopping:
+                self.condition.wait()
+            if self.frame_id > self.read_id:
+                self.read_id = self.frame_id
+            elif self.stopping:
+                return None, None
+            else:
+                self.stale += 1
+            return self.frame, self.timestamp
+
+    def read(self):
+        frame, _ = self.read_latest()
+        return frame is not None, frame
+
+    def stats(self):
+        return f"{self.grabbed} frames grabbed, {self.dropped} dropped, {self.stale} stale reads"
+
+    def release(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.capture.release()
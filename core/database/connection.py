@@ -0,0 +1,216 @@
+import time
+import threading
+
+from core.database.db_setup import CONNECTION_KEYS
+
+DEFAULT_POOL_SIZE = 4
+HEALTH_CHECK_INTERVAL = 30      # seconds a connection may sit idle before it is pinged
+RECONNECT_DELAY = 1.0           # first wait after a failed connect, doubled up to the max
+MAX_RECONNECT_DELAY = 30.0
+
+class DatabaseUnavailable(Exception):
+    """Raised while the database cannot be reached and the next reconnect is not due yet."""
+
+def connection_params(credentials):
+    params = {key: credentials[key] for key in CONNECTION_KEYS}
+    params["port"] = int(params["port"])
+    return params
+
+# ------- Connection Pool -------
+class ConnectionPool:
+    """
+    Per-process pool of open connections: psycopg2's ThreadedConnectionPool,
+    mysql.connector's MySQLConnectionPool, or one connection per thread for
+    SQLite. The server pools are created on first use, so a process can
+    start while the database is still down.
+    """
+    def __init__(self, credentials, size=DEFAULT_POOL_SIZE):
+        self.credentials = credentials
+        self.engine = credentials["engine"]
+        self.size = size
+        self.pool = None
+        self.local = threading.local()
+        self.sqlite_conns = []
+        self.lock = threading.Lock()
+
+        if self.engine == "postgresql":
+            import psycopg2
+            import psycopg2.pool
+            self.errors = (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.pool.PoolError)
+            self.transient_errors = self.errors
+        elif self.engine == "mysql":
+            import mysql.connector
+            self.errors = (mysql.connector.Error,)
+            # mysql.connector.Error also covers bad data; only these mean the link failed
+            self.transient_errors = (mysql.connector.errors.OperationalError,
+                                     mysql.connector.errors.InterfaceError, mysql.connector.errors.PoolError)
+        elif self.engine == "sqlite":
+            import sqlite3
+            self.errors = (sqlite3.OperationalError,)
+            self.transient_errors = self.errors
+        else:
+            raise ValueError(f"Unsupported database engine: {self.engine}")
+
+    def _create_pool(self):
+        if self.engine == "postgresql":
+            from psycopg2.pool import ThreadedConnectionPool
+            return ThreadedConnectionPool(0, self.size, **connection_params(self.credentials))
+        from mysql.connector.pooling import MySQLConnectionPool
+        return MySQLConnectionPool(pool_name="maritime_tracker", pool_size=self.size,
+                                   **connection_params(self.credentials))
+
+    def getconn(self):
+        if self.engine == "sqlite":
+            conn = getattr(self.local, "conn", None)
+            if conn is None:
+                from core.database.sqlite_backend import connect_sqlite
+                conn = self.local.conn = connect_sqlite(self.credentials.get("path"))
+                self.sqlite_conns.append(conn)
+            return conn
+
+        with self.lock:
+            if self.pool is None:
+                self.pool = self._create_pool()
+        if self.engine == "postgresql":
+            return self.pool.getconn()
+        # The MySQL pool reconnects a returned connection that has dropped
+        return self.pool.get_connection()
+
+    def putconn(self, conn, broken=False):
+        try:
+            if self.engine == "postgresql":
+                self.pool.putconn(conn, close=broken)
+            elif self.engine == "mysql":
+                conn.close()
+            elif broken:
+                conn.close()
+                self.sqlite_conns.remove(conn)
+                self.local.conn = None
+        except Exception:
+            pass
+
+    def ping(self, conn):
+        if self.engine == "postgresql" and conn.closed:
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def connection(self, health_check_interval=HEALTH_CHECK_INTERVAL):
+        return ManagedConnection(self, health_check_interval)
+
+    def closeall(self):
+        if self.engine == "postgresql" and self.pool is not None:
+            self.pool.closeall()
+        for conn in self.sqlite_conns:
+            conn.close()
+        self.sqlite_conns = []
+
+# ------- Managed Connection -------
+class ManagedConnection:
+    """
+    A pooled connection for a long-running process, used like a DB-API
+    connection. It is pinged before use when it has been idle or the last
+    transaction was rolled back, and replaced when the ping fails. While
+    the database is down, reconnects back off exponentially and callers
+    get DatabaseUnavailable instead of blocking.
+    """
+    def __init__(self, pool, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.pool = pool
+        self.engine = pool.engine
+        self.health_check_interval = health_check_interval
+        self.conn = None
+        self.last_used = 0.0
+        self.suspect = False
+        self.delay = RECONNECT_DELAY
+        self.next_attempt_at = 0.0
+        self.connects = 0
+
+    def _acquire(self):
+        now = time.monotonic()
+        if now < self.next_attempt_at:
+            raise DatabaseUnavailable(f"next reconnect in {self.next_attempt_at - now:.0f}s")
+        try:
+            conn = self.pool.getconn()
+        except self.pool.errors as err:
+            self.next_attempt_at = now + self.delay
+            self.delay = min(self.delay * 2, MAX_RECONNECT_DELAY)
+            raise DatabaseUnavailable(str(err).strip()) from err
+        self.delay = RECONNECT_DELAY
+        self.connects += 1
+        if self.connects > 1:
+            print(f"Reconnected to {self.engine} database.")
+        return conn
+
+    def connection(self, wait=False):
+        """The underlying connection, checked and reconnected as needed. wait=True retries until it succeeds."""
+        while True:
+            try:
+                return self._checked()
+            except DatabaseUnavailable as err:
+                if not wait:
+                    raise
+                delay = max(self.next_attempt_at - time.monotonic(), 0)
+                print(f"Database unavailable ({err}), retrying in {delay:.0f}s...")
+                time.sleep(delay)
+
+    def _checked(self):
+        now = time.monotonic()
+        if self.conn is not None and (self.suspect or now - self.last_used >= self.health_check_interval):
+            if not self.pool.ping(self.conn):
+                self._discard()
+        if self.conn is None:
+            self.conn = self._acquire()
+        self.suspect = False
+        self.last_used = now
+        return self.conn
+
+    def _discard(self):
+        if self.conn is not None:
+            self.pool.putconn(self.conn, broken=True)
+            self.conn = None
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    def commit(self):
+        if self.conn is None:
+            raise DatabaseUnavailable("connection was lost before commit")
+        try:
+            self.conn.commit()
+        except self.pool.errors:
+            self._discard()
+            raise
+
+    def rollback(self):
+        # A failed transaction may mean a dropped connection: ping before the next use
+        self.suspect = True
+        if self.conn is None:
+            return
+        try:
+            self.conn.rollback()
+        except Exception:
+            self._discard()
+
+    def close(self):
+        if self.conn is not None:
+            self.pool.putconn(self.conn)
+            self.conn = None
+
+def connect(credentials, wait=False, pool_size=1):
+    """
+    Open a ManagedConnection from a pool of its own, for scripts that need
+    one connection. Close both with `close_connection`.
+    """
+    conn = ConnectionPool(credentials, size=pool_size).connection()
+    conn.connection(wait=wait)
+    return conn
+
+def close_connection(conn):
+    conn.close()
+    conn.pool.closeall()
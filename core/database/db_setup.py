@@ -3,6 +3,16 @@ import json
 
 CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), "credentials.json")
 
+CONNECTION_KEYS = ("host", "port", "user", "password", "database")
+
+# Position history settings, stored under "history" in credentials.json
+DEFAULT_HISTORY = {
+    "partitioning": "none",     # "none", "daily" or "monthly"
+    "retention_days": 0,        # 0 keeps everything
+    "hourly_rollup": True,      # keep hourly tracks of the history that is dropped
+}
+PARTITIONING_OPTIONS = ("none", "daily", "monthly")
+
 def load_credentials():
     if not os.path.exists(CREDENTIALS_PATH):
         raise FileNotFoundError("Database credentials file not found.")
@@ -10,83 +20,330 @@ def load_credentials():
     with open(CREDENTIALS_PATH, "r") as f:
         return json.load(f)
 
-# ------- Table Definition -------
-SHIP_TABLE_SQL = """
-    CREATE TABLE IF NOT EXISTS ships (
+def history_settings(config):
+    return {**DEFAULT_HISTORY, **config.get("history", {})}
+
+# ------- Table Definitions -------
+# One row per ship, upserted whenever its details change
+VESSELS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {vessels} (
+        mmsi BIGINT PRIMARY KEY,
+        name TEXT,
+        image_path TEXT,
+        navigation_status TEXT,
+        destination TEXT,
+        eta TEXT,
+        updated_at {timestamp_type}
+    );
+"""
+
+# Narrow position history, one row per stored fix
+POSITIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {positions} (
         id {id_type} PRIMARY KEY,
-        timestamp {timestamp_type},
-        mmsi BIGINT,
+        mmsi BIGINT NOT NULL,
+        timestamp {timestamp_type} NOT NULL,
         latitude {latlon_type},
         longitude {latlon_type},
         speed {speed_type},
-        image_path TEXT,
-        name TEXT,
-        destination TEXT,
-        eta TEXT,
-        navigation_status TEXT
+        course {course_type},
+        heading SMALLINT
     );
 """
 
+# Same columns, range partitioned on timestamp so old history can be dropped
+# a partition at a time. Both engines need the partition key in the primary key.
+POSITIONS_PARTITIONED_SQL = {
+    "postgresql": """
+        CREATE TABLE IF NOT EXISTS {positions} (
+            id BIGSERIAL,
+            mmsi BIGINT NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            latitude NUMERIC(9,6),
+            longitude NUMERIC(9,6),
+            speed NUMERIC(5,2),
+            course NUMERIC(4,1),
+            heading SMALLINT,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+    """,
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS {positions} (
+            id BIGINT AUTO_INCREMENT,
+            mmsi BIGINT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            latitude DECIMAL(9,6),
+            longitude DECIMAL(9,6),
+            speed DECIMAL(5,2),
+            course DECIMAL(4,1),
+            heading SMALLINT,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE COLUMNS (timestamp) (
+            PARTITION p_future VALUES LESS THAN (MAXVALUE)
+        );
+    """,
+}
+
+# One averaged point per ship and hour, written before old history is dropped
+HOURLY_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS positions_hourly (
+        mmsi BIGINT NOT NULL,
+        hour {timestamp_type} NOT NULL,
+        latitude {latlon_type},
+        longitude {latlon_type},
+        max_speed {speed_type},
+        fixes INT,
+        PRIMARY KEY (mmsi, hour)
+    );
+"""
+
+# Latest fix per ship, upserted on every position so the display reads
+# the live fleet instead of aggregating over the whole history
+LATEST_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {latest} (
+        mmsi BIGINT PRIMARY KEY,
+        timestamp {timestamp_type} NOT NULL,
+        latitude {latlon_type},
+        longitude {latlon_type},
+        speed {speed_type},
+        course {course_type},
+        heading SMALLINT
+    );
+"""
+
+COLUMN_TYPES = {
+    "postgresql": {
+        "id_type": "SERIAL",
+        "timestamp_type": "TIMESTAMP",
+        "latlon_type": "NUMERIC(9,6)",
+        "speed_type": "NUMERIC(5,2)",
+        "course_type": "NUMERIC(4,1)",
+    },
+    "mysql": {
+        "id_type": "INT AUTO_INCREMENT",
+        "timestamp_type": "DATETIME",
+        "latlon_type": "DECIMAL(9,6)",
+        "speed_type": "DECIMAL(5,2)",
+        "course_type": "DECIMAL(4,1)",
+    },
+    # INTEGER PRIMARY KEY aliases the rowid; TIMESTAMP columns come back as datetime
+    "sqlite": {
+        "id_type": "INTEGER",
+        "timestamp_type": "TIMESTAMP",
+        "latlon_type": "REAL",
+        "speed_type": "REAL",
+        "course_type": "REAL",
+    },
+}
+
+VESSEL_COLUMNS = ("mmsi", "name", "image_path", "navigation_status", "destination", "eta", "updated_at")
+POSITION_COLUMNS = ("mmsi", "timestamp", "latitude", "longitude", "speed", "course", "heading")
+
+# (name suffix, columns): (timestamp, mmsi) serves the refresh window and its
+# GROUP BY from the index alone, (mmsi, timestamp) the join back to each latest row
+POSITION_INDEXES = (
+    ("time_mmsi", "timestamp, mmsi"),
+    ("mmsi_time", "mmsi, timestamp"),
+)
+LATEST_INDEXES = (
+    ("time", "timestamp"),
+)
+
+def create_tables(cur, engine, positions="positions", vessels="vessels", latest="ship_latest",
+                  partitioning="none"):
+    """
+    Create missing tables. `partitioning` only applies when positions does
+    not exist yet, and is ignored on SQLite, which has no partitions.
+    """
+    types = COLUMN_TYPES[engine]
+    cur.execute(VESSELS_TABLE_SQL.format(vessels=vessels, **types))
+    if partitioning in ("daily", "monthly") and engine in POSITIONS_PARTITIONED_SQL:
+        cur.execute(POSITIONS_PARTITIONED_SQL[engine].format(positions=positions))
+    else:
+        cur.execute(POSITIONS_TABLE_SQL.format(positions=positions, **types))
+    cur.execute(LATEST_TABLE_SQL.format(latest=latest, **types))
+    cur.execute(HOURLY_TABLE_SQL.format(**types))
+
+def index_exists(cur, engine, table, index):
+    if engine == "postgresql":
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (index,))
+    elif engine == "sqlite":
+        cur.execute("SELECT COUNT(*) > 0 FROM sqlite_master WHERE type = 'index' AND name = %s", (index,))
+    else:
+        cur.execute(
+            "SELECT COUNT(*) > 0 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s", (table, index))
+    return bool(cur.fetchone()[0])
+
+def create_indexes(cur, engine, table="positions", indexes=POSITION_INDEXES):
+    """Create the indexes of `table` that are missing. Returns the names created."""
+    created = []
+    for suffix, columns in indexes:
+        index = f"idx_{table}_{suffix}"
+        if not index_exists(cur, engine, table, index):
+            cur.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+            created.append(index)
+    return created
+
+def vessel_upsert_sql(engine):
+    """Insert or update a vessel row, keeping known values when the new ones are NULL."""
+    columns = ", ".join(VESSEL_COLUMNS)
+    placeholders = ", ".join(["%s"] * len(VESSEL_COLUMNS))
+    if engine in ("postgresql", "sqlite"):
+        updates = ", ".join(f"{col} = COALESCE(EXCLUDED.{col}, vessels.{col})" for col in VESSEL_COLUMNS[1:])
+        return f"INSERT INTO vessels ({columns}) VALUES ({placeholders}) ON CONFLICT (mmsi) DO UPDATE SET {updates}"
+    updates = ", ".join(f"{col} = COALESCE(VALUES({col}), {col})" for col in VESSEL_COLUMNS[1:])
+    return f"INSERT INTO vessels ({columns}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
+
+def latest_upsert_sql(engine, values):
+    """
+    Upsert into ship_latest that never replaces a newer fix with an older one.
+    `values` is the VALUES clause body: "%s" for execute_values, or one
+    placeholder group for executemany. SQLite shares the PostgreSQL syntax.
+    """
+    columns = ", ".join(POSITION_COLUMNS)
+    sql = f"INSERT INTO ship_latest ({columns}) VALUES {values}"
+    fields = [col for col in POSITION_COLUMNS if col not in ("mmsi", "timestamp")]
+    if engine in ("postgresql", "sqlite"):
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in ["timestamp"] + fields)
+        return (f"{sql} ON CONFLICT (mmsi) DO UPDATE SET {updates} "
+                f"WHERE ship_latest.timestamp <= EXCLUDED.timestamp")
+    # MySQL applies assignments left to right, so timestamp has to be updated last
+    updates = [f"{col} = IF(VALUES(timestamp) >= timestamp, VALUES({col}), {col})" for col in fields]
+    updates.append("timestamp = GREATEST(timestamp, VALUES(timestamp))")
+    return f"{sql} ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+
+def backfill_latest(conn, engine):
+    """Fill an empty ship_latest from the position history, e.g. after an upgrade."""
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM ship_latest")
+    if cur.fetchone()[0]:
+        cur.close()
+        return 0
+
+    columns = ", ".join(POSITION_COLUMNS)
+    selected = ", ".join(f"p.{col}" for col in POSITION_COLUMNS)
+    cur.execute(f"""
+        INSERT INTO ship_latest ({columns})
+        SELECT {selected}
+        FROM positions p
+        INNER JOIN (SELECT MAX(id) AS id FROM positions GROUP BY mmsi) latest ON p.id = latest.id
+    """)
+    backfilled = cur.rowcount
+    conn.commit()
+    cur.close()
+    return backfilled
+
+# ------- Migration From The Old 'ships' Table -------
+def table_exists(cur, engine, table):
+    if engine == "postgresql":
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    elif engine == "sqlite":
+        cur.execute("SELECT COUNT(*) > 0 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+    else:
+        cur.execute(
+            "SELECT COUNT(*) > 0 FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s", (table,))
+    return bool(cur.fetchone()[0])
+
+def migrate_ships_table(conn, engine):
+    """
+    Copy rows from the old wide 'ships' table into 'vessels' and 'positions',
+    then rename it to 'ships_legacy'. Does nothing if there is no 'ships'
+    table, so it is safe to run on every setup.
+    """
+    cur = conn.cursor()
+    if not table_exists(cur, engine, "ships"):
+        cur.close()
+        return 0
+
+    # Vessel details come from the most recent row of each ship
+    # SQLite cannot parse ON CONFLICT after a join, so it uses INSERT OR IGNORE
+    ignore, conflict = {
+        "postgresql": ("", " ON CONFLICT (mmsi) DO NOTHING"),
+        "sqlite": (" OR IGNORE", ""),
+    }.get(engine, (" IGNORE", ""))
+    cur.execute(f"""
+        INSERT{ignore} INTO vessels (mmsi, name, image_path, navigation_status, destination, eta, updated_at)
+        SELECT s.mmsi, s.name, s.image_path, s.navigation_status, s.destination, s.eta, s.timestamp
+        FROM ships s
+        INNER JOIN (SELECT MAX(id) AS id FROM ships GROUP BY mmsi) latest ON s.id = latest.id
+        {conflict}
+    """)
+    cur.execute("""
+        INSERT INTO positions (mmsi, timestamp, latitude, longitude, speed)
+        SELECT mmsi, timestamp, latitude, longitude, speed
+        FROM ships
+        WHERE mmsi IS NOT NULL AND timestamp IS NOT NULL
+        ORDER BY id
+    """)
+    migrated = cur.rowcount
+
+    if engine in ("postgresql", "sqlite"):
+        cur.execute("ALTER TABLE ships RENAME TO ships_legacy")
+    else:
+        cur.execute("RENAME TABLE ships TO ships_legacy")
+    conn.commit()
+    cur.close()
+    return migrated
+
+# ------- Upgrade Existing Databases -------
+def upgrade_database(conn, engine, history=None):
+    """
+    Bring a database up to the current schema: create missing tables,
+    migrate an old 'ships' table, fill ship_latest and add missing
+    indexes. With a partitioned history, the upcoming partitions are
+    created too. Safe to run any number of times.
+    Returns (rows migrated, indexes created).
+    """
+    from core.database.retention import ensure_partitions
+
+    history = {**DEFAULT_HISTORY, **(history or {})}
+    cur = conn.cursor()
+    create_tables(cur, engine, partitioning=history["partitioning"])
+    conn.commit()
+    ensure_partitions(conn, engine, history["partitioning"])
+
+    migrated = migrate_ships_table(conn, engine)
+    backfill_latest(conn, engine)
+
+    created = create_indexes(cur, engine)
+    created += create_indexes(cur, engine, table="ship_latest", indexes=LATEST_INDEXES)
+    conn.commit()
+    cur.close()
+    return migrated, created
+
 # ------- Setup Database Function -------
 def setup_database(config):
     """
-    Create a connection to the database and initialize the ships table.
+    Create a connection to the database, initialize the vessels and
+    positions tables with their indexes and migrate any old 'ships'
+    table into them.
     
-    Supported engines: 'postgresql', 'mysql'
+    Supported engines: 'postgresql', 'mysql', 'sqlite'
     """
     try:
+        from core.database.connection import connect, close_connection
+
         engine = config.get("engine")
-        
-        if engine == "postgresql":
-            import psycopg2
-            conn = psycopg2.connect(
-                dbname=config["database"],
-                user=config["user"],
-                password=config["password"],
-                host=config["host"],
-                port=config["port"]
-            )
-            cur = conn.cursor()
-
-            cur.execute(SHIP_TABLE_SQL.format(
-                id_type="SERIAL",
-                timestamp_type="TIMESTAMP",
-                latlon_type="NUMERIC(9,6)",
-                speed_type="NUMERIC(5,2)"
-            ))
-
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            return True, "PostgreSQL: Connected and table 'ships' created."
-
-        elif engine == "mysql":
-            import mysql.connector
-            conn = mysql.connector.connect(
-                host=config["host"],
-                port=config["port"],
-                user=config["user"],
-                password=config["password"],
-                database=config["database"]
-            )
-            cur = conn.cursor()
-
-            cur.execute(SHIP_TABLE_SQL.format(
-                id_type="INT AUTO_INCREMENT",
-                timestamp_type="DATETIME",
-                latlon_type="DECIMAL(9,6)",
-                speed_type="DECIMAL(5,2)"
-            ))
-
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            return True, "MySQL: Connected and table 'ships' created."
-
-        else:
+        label = {"postgresql": "PostgreSQL", "mysql": "MySQL", "sqlite": "SQLite"}.get(engine)
+        if label is None:
             return False, f"Unsupported database engine: '{engine}'"
+        conn = connect(config)
+
+        migrated, created = upgrade_database(conn, engine, history_settings(config))
+        close_connection(conn)
+
+        message = f"{label}: Connected and tables 'vessels', 'positions' and 'ship_latest' created."
+        if migrated:
+            message += f" Migrated {migrated} rows from 'ships'."
+        if created:
+            message += f" Created indexes: {', '.join(created)}."
+        return True, message
 
     except Exception as e:
         return False, str(e)
+
+if __name__ == "__main__":
+    ok, message = setup_database(load_credentials())
+    print(message)
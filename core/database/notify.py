@@ -0,0 +1,158 @@
+import json
+import select
+import socket
+import time
+
+from core.database.connection import connection_params
+
+CHANNEL = "ship_updates"
+NOTIFY_HOST = "127.0.0.1"
+NOTIFY_PORT = 47474             # UDP port the display listens on for MySQL and SQLite
+PAYLOAD_LIMIT = 7900            # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+RECONNECT_INTERVAL = 10         # seconds between attempts to LISTEN again
+
+# ------- Message Format -------
+# {"p": [[mmsi, timestamp, lat, lon], ...], "v": [[mmsi, name, image_path, navigation_status, destination, eta], ...]}
+def encode_updates(positions, vessels, limit=PAYLOAD_LIMIT):
+    """Split position and vessel updates into JSON messages of at most `limit` bytes."""
+    messages = []
+    current, size = {"p": [], "v": []}, 16
+    items = [("p", row) for row in positions] + [("v", row) for row in vessels]
+    for key, item in items:
+        length = len(json.dumps(item, default=str, separators=(",", ":"))) + 1
+        if size + length > limit and (current["p"] or current["v"]):
+            messages.append(json.dumps(current, default=str, separators=(",", ":")))
+            current, size = {"p": [], "v": []}, 16
+        current[key].append(item)
+        size += length
+    if current["p"] or current["v"]:
+        messages.append(json.dumps(current, default=str, separators=(",", ":")))
+    return messages
+
+# ------- Receiver Side -------
+class UpdateNotifier:
+    """
+    Announces each batch the BatchWriter commits. On PostgreSQL the
+    messages are sent with pg_notify inside the batch transaction, so
+    listeners only hear about committed rows. Other engines send them as
+    UDP datagrams to the display once the commit has succeeded.
+    """
+    def __init__(self, engine, host=NOTIFY_HOST, port=NOTIFY_PORT):
+        self.engine = engine
+        self.address = (host, port)
+        self.pending = []
+        self.sent = 0
+        self.sock = None
+        if engine != "postgresql":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def stage(self, cursor, latest, vessels):
+        """Queue the ship_latest rows and vessel rows of a batch, ordered as in the writer."""
+        positions = [(row[0], row[1], row[2], row[3]) for row in latest]
+        details = [row[:6] for row in vessels]
+        messages = encode_updates(positions, details)
+        if self.engine == "postgresql":
+            for message in messages:
+                cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, message))
+        else:
+            self.pending.extend(messages)
+
+    def commit(self):
+        for message in self.pending:
+            try:
+                self.sock.sendto(message.encode(), self.address)
+            except OSError:
+                pass        # nobody listening is fine
+        self.sent += len(self.pending)
+        self.pending = []
+
+    def discard(self):
+        self.pending = []
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+# ------- Display Side -------
+class UpdateListener:
+    """
+    Non-blocking receiver for UpdateNotifier messages: LISTEN on a
+    dedicated autocommit connection for PostgreSQL, a localhost UDP socket
+    otherwise. `connected` is False while no updates can arrive, so the
+    caller knows to fall back to polling.
+    """
+    def __init__(self, credentials, host=NOTIFY_HOST, port=NOTIFY_PORT):
+        self.credentials = credentials
+        self.engine = credentials["engine"]
+        self.address = (host, port)
+        self.conn = None
+        self.sock = None
+        self.last_attempt = 0.0
+        self.received = 0
+        self._open()
+
+    @property
+    def connected(self):
+        return self.conn is not None or self.sock is not None
+
+    def _open(self):
+        self.last_attempt = time.monotonic()
+        try:
+            if self.engine == "postgresql":
+                import psycopg2
+                self.conn = psycopg2.connect(**connection_params(self.credentials))
+                self.conn.autocommit = True
+                cursor = self.conn.cursor()
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.close()
+            else:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sock.bind(self.address)
+                self.sock.setblocking(False)
+        except Exception as err:
+            print(f"Live updates unavailable, polling instead: {err}")
+            self.close()
+
+    def poll(self):
+        """Return the update messages that arrived since the last call, without waiting."""
+        if not self.connected:
+            if time.monotonic() - self.last_attempt >= RECONNECT_INTERVAL:
+                self._open()
+            return []
+
+        payloads = []
+        try:
+            if self.conn is not None:
+                if select.select([self.conn], [], [], 0)[0]:
+                    self.conn.poll()
+                    payloads = [notify.payload for notify in self.conn.notifies]
+                    self.conn.notifies.clear()
+            else:
+                while True:
+                    try:
+                        payloads.append(self.sock.recv(65536).decode())
+                    except BlockingIOError:
+                        break
+        except Exception as err:
+            print(f"Live updates lost, polling until they are back: {err}")
+            self.close()
+
+        messages = []
+        for payload in payloads:
+            try:
+                messages.append(json.loads(payload))
+            except ValueError:
+                continue
+        self.received += len(messages)
+        return messages
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,55 @@
+# ------- Display Queries -------
+# Live fleet from ship_latest: one row per ship, so cost follows fleet size, not history size
+LIVE_POSITIONS_SQL = """
+    SELECT l.mmsi, l.latitude, l.longitude, v.image_path, v.name, v.destination, v.eta, v.navigation_status,
+           l.timestamp
+    FROM {latest} l
+    LEFT JOIN {vessels} v ON v.mmsi = l.mmsi
+    WHERE l.timestamp > %s
+    ORDER BY l.timestamp DESC
+"""
+
+# Positions stored after a known id, same columns as LIVE_POSITIONS_SQL after the id.
+# A range read on the primary key, however long the history is.
+NEW_POSITIONS_SQL = """
+    SELECT p.id, p.mmsi, p.latitude, p.longitude, v.image_path, v.name, v.destination, v.eta,
+           v.navigation_status, p.timestamp
+    FROM {positions} p
+    LEFT JOIN {vessels} v ON v.mmsi = p.mmsi
+    WHERE p.id > %s
+    ORDER BY p.id
+"""
+
+# Latest fix of every ship seen in a time window, aggregated from the full history
+# (kept for the refresh benchmark and for databases without ship_latest)
+LATEST_POSITIONS_SQL = """
+    SELECT p.mmsi, p.latitude, p.longitude, v.image_path, v.name, v.destination, v.eta, v.navigation_status
+    FROM {positions} p
+    INNER JOIN (
+        SELECT mmsi, MAX(timestamp) AS latest_timestamp
+        FROM {positions}
+        WHERE timestamp BETWEEN %s AND %s
+        GROUP BY mmsi
+    ) latest ON p.mmsi = latest.mmsi AND p.timestamp = latest.latest_timestamp
+    LEFT JOIN {vessels} v ON v.mmsi = p.mmsi
+    ORDER BY p.timestamp DESC
+"""
+
+def fetch_live_positions(cursor, since, latest="ship_latest", vessels="vessels"):
+    cursor.execute(LIVE_POSITIONS_SQL.format(latest=latest, vessels=vessels), (since,))
+    return cursor.fetchall()
+
+def fetch_last_position_id(cursor, positions="positions"):
+    cursor.execute(f"SELECT MAX(id) FROM {positions}")
+    return cursor.fetchone()[0] or 0
+
+def fetch_new_positions(cursor, last_id, positions="positions", vessels="vessels"):
+    cursor.execute(NEW_POSITIONS_SQL.format(positions=positions, vessels=vessels), (last_id,))
+    return cursor.fetchall()
+
+def latest_positions_query(positions="positions", vessels="vessels"):
+    return LATEST_POSITIONS_SQL.format(positions=positions, vessels=vessels)
+
+def fetch_latest_positions(cursor, start_time, end_time, positions="positions", vessels="vessels"):
+    cursor.execute(latest_positions_query(positions, vessels), (start_time, end_time))
+    return cursor.fetchall()
@@ -0,0 +1,272 @@
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.database.db_setup import load_credentials, history_settings
+from core.database.connection import connect, close_connection
+
+PARTITIONS_AHEAD = 3            # future periods kept ready so inserts never miss a partition
+DELETE_BATCH = 10000            # rows per DELETE when the history is not partitioned
+STOP_TIMEOUT = 5                # seconds stop() waits for a running maintenance pass
+
+# ------- Partition Periods -------
+def period_start(day, granularity):
+    return day if granularity == "daily" else day.replace(day=1)
+
+def next_period(start, granularity):
+    if granularity == "daily":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def partition_suffix(start, granularity):
+    return start.strftime("%Y%m%d" if granularity == "daily" else "%Y%m")
+
+def suffix_period(suffix):
+    """(start, end) encoded in a partition name suffix, or None for p_future/default."""
+    granularity = {8: "daily", 6: "monthly"}.get(len(suffix))
+    if granularity is None:
+        return None
+    try:
+        start = datetime.strptime(suffix, "%Y%m%d" if granularity == "daily" else "%Y%m").date()
+    except ValueError:
+        return None
+    return start, next_period(start, granularity)
+
+# ------- Partition Catalog -------
+def is_partitioned(cur, engine):
+    if engine == "postgresql":
+        cur.execute("SELECT COUNT(*) > 0 FROM pg_class WHERE relname = 'positions' AND relkind = 'p'")
+    elif engine == "mysql":
+        cur.execute(
+            "SELECT COUNT(*) > 0 FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = 'positions' AND partition_name IS NOT NULL")
+    else:
+        return False
+    return bool(cur.fetchone()[0])
+
+def list_partitions(cur, engine):
+    """Sorted (start, end, name) of the dated partitions of positions."""
+    if engine == "postgresql":
+        cur.execute("""
+            SELECT child.relname
+            FROM pg_inherits i
+            JOIN pg_class child ON child.oid = i.inhrelid
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            WHERE parent.relname = 'positions'
+        """)
+        names = [row[0] for row in cur.fetchall()]
+        prefix = "positions_p"
+    else:
+        cur.execute(
+            "SELECT partition_name FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = 'positions'")
+        names = [row[0] for row in cur.fetchall()]
+        prefix = "p"
+
+    partitions = []
+    for name in names:
+        period = suffix_period(name[len(prefix):]) if name.startswith(prefix) else None
+        if period is not None:
+            partitions.append((period[0], period[1], name))
+    return sorted(partitions)
+
+def effective_partitioning(conn, engine, requested):
+    """
+    The partitioning positions actually has. A choice only applies when the
+    table is created, so an existing unpartitioned (or SQLite) history stays
+    "none", and a partitioned one keeps the granularity of its partitions.
+    """
+    cur = conn.cursor()
+    try:
+        if not is_partitioned(cur, engine):
+            return "none"
+        for start, end, _ in list_partitions(cur, engine):
+            return "daily" if end - start == timedelta(days=1) else "monthly"
+        return requested
+    finally:
+        cur.close()
+
+def ensure_partitions(conn, engine, granularity, today=None, ahead=PARTITIONS_AHEAD):
+    """Create the partitions for the current period and the next `ahead` ones."""
+    if granularity not in ("daily", "monthly"):
+        return []
+    cur = conn.cursor()
+    if not is_partitioned(cur, engine):
+        cur.close()
+        return []
+
+    existing = {start for start, _, _ in list_partitions(cur, engine)}
+    created = []
+    start = period_start(today or date.today(), granularity)
+
+    if engine == "postgresql":
+        cur.execute("CREATE TABLE IF NOT EXISTS positions_default PARTITION OF positions DEFAULT")
+
+    for _ in range(ahead + 1):
+        end = next_period(start, granularity)
+        if start not in existing:
+            suffix = partition_suffix(start, granularity)
+            if engine == "postgresql":
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS positions_p{suffix} PARTITION OF positions "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')")
+            else:
+                # New ranges are split off the empty catch-all partition
+                cur.execute(
+                    f"ALTER TABLE positions REORGANIZE PARTITION p_future INTO ("
+                    f"PARTITION p{suffix} VALUES LESS THAN ('{end} 00:00:00'), "
+                    f"PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+            created.append(suffix)
+        start = end
+
+    conn.commit()
+    cur.close()
+    return created
+
+# ------- Rollup And Retention -------
+def rollup_hourly(cur, engine, start, end, table="positions"):
+    """Average each ship's fixes per hour in [start, end) into positions_hourly; start None means no lower bound."""
+    if engine == "postgresql":
+        hour = "date_trunc('hour', timestamp)"
+        insert, conflict = "INSERT INTO", "ON CONFLICT (mmsi, hour) DO NOTHING"
+    elif engine == "sqlite":
+        hour = "strftime('%%Y-%%m-%%d %%H:00:00', timestamp)"
+        insert, conflict = "INSERT OR IGNORE INTO", ""
+    else:
+        hour = "TIMESTAMP(DATE(timestamp), MAKETIME(HOUR(timestamp), 0, 0))"
+        insert, conflict = "INSERT IGNORE INTO", ""
+    cur.execute(f"""
+        {insert} positions_hourly (mmsi, hour, latitude, longitude, max_speed, fixes)
+        SELECT mmsi, {hour}, AVG(latitude), AVG(longitude), MAX(speed), COUNT(*)
+        FROM {table}
+        WHERE {"timestamp < %s" if start is None else "timestamp >= %s AND timestamp < %s"}
+        GROUP BY mmsi, {hour}
+        {conflict}
+    """, (end,) if start is None else (start, end))
+    return cur.rowcount
+
+def drop_expired_partitions(conn, engine, history, today=None):
+    """Drop whole partitions that end before the retention cutoff. Returns the names dropped."""
+    cutoff = (today or date.today()) - timedelta(days=history["retention_days"])
+    cur = conn.cursor()
+    dropped = []
+    for position, (start, end, name) in enumerate(list_partitions(cur, engine)):
+        if end > cutoff:
+            break
+        if history["hourly_rollup"]:
+            # MySQL's lowest range partition also holds every older row, e.g. migrated history
+            rollup_hourly(cur, engine, None if engine == "mysql" and position == 0 else start, end)
+        if engine == "postgresql":
+            cur.execute(f"DROP TABLE {name}")
+        else:
+            cur.execute(f"ALTER TABLE positions DROP PARTITION {name}")
+        conn.commit()
+        dropped.append(name)
+    cur.close()
+    return dropped
+
+def delete_expired_rows(conn, engine, history, today=None, table="positions"):
+    """
+    Fallback for unpartitioned history, and for PostgreSQL's default
+    partition: roll up, then DELETE old rows of `table` in batches.
+    """
+    cutoff = datetime.combine((today or date.today()) - timedelta(days=history["retention_days"]),
+                              datetime.min.time())
+    cur = conn.cursor()
+    if history["hourly_rollup"]:
+        cur.execute(f"SELECT MIN(timestamp) FROM {table} WHERE timestamp < %s", (cutoff,))
+        oldest = cur.fetchone()[0]
+        if oldest is not None:
+            rollup_hourly(cur, engine, oldest, cutoff, table)
+            conn.commit()
+
+    deleted = 0
+    while True:
+        if engine in ("postgresql", "sqlite"):
+            cur.execute(
+                f"DELETE FROM {table} WHERE id IN "
+                f"(SELECT id FROM {table} WHERE timestamp < %s LIMIT %s)", (cutoff, DELETE_BATCH))
+        else:
+            cur.execute(f"DELETE FROM {table} WHERE timestamp < %s LIMIT %s", (cutoff, DELETE_BATCH))
+        conn.commit()
+        deleted += cur.rowcount
+        if cur.rowcount < DELETE_BATCH:
+            break
+    cur.close()
+    return deleted
+
+def run_retention(conn, engine, history, today=None):
+    """
+    Periodic history maintenance: keep future partitions ready and remove
+    history older than `retention_days`, by dropping partitions when the
+    table is partitioned and by batched DELETE otherwise. On PostgreSQL the
+    default partition, which catches migrated history and rows older than
+    the first partition, is trimmed by batched DELETE as well.
+    """
+    ensure_partitions(conn, engine, history["partitioning"], today)
+    if not history["retention_days"]:
+        return "retention disabled"
+
+    cur = conn.cursor()
+    partitioned = is_partitioned(cur, engine)
+    cur.close()
+    if partitioned:
+        dropped = drop_expired_partitions(conn, engine, history, today)
+        report = f"dropped partitions: {', '.join(dropped) or 'none'}"
+        if engine == "postgresql":
+            deleted = delete_expired_rows(conn, engine, history, today, table="positions_default")
+            report += f", deleted {deleted} old rows from positions_default"
+        return report
+    return f"deleted {delete_expired_rows(conn, engine, history, today)} old rows"
+
+# ------- Background Maintenance -------
+class RetentionWorker:
+    """
+    Runs `run_retention` every `interval` seconds on a daemon thread with a
+    connection of its own, so rollups and batched DELETEs over a large
+    history never stall the receiver's ingest loop. The first pass runs
+    right after start().
+    """
+    def __init__(self, credentials, interval):
+        self.credentials = credentials
+        self.engine = credentials["engine"]
+        self.history = history_settings(credentials)
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        conn = None
+        while not self.stopping.is_set():
+            try:
+                if conn is None:
+                    conn = connect(self.credentials)
+                print(f"History maintenance: {run_retention(conn, self.engine, self.history)}")
+            except Exception as err:
+                if conn is not None:
+                    conn.rollback()
+                print(f"Error during history maintenance: {err}")
+            self.stopping.wait(self.interval)
+        if conn is not None:
+            close_connection(conn)
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=STOP_TIMEOUT)
+            if self.thread.is_alive():
+                print("History maintenance still running, leaving it to finish in the background.")
+
+if __name__ == "__main__":
+    credentials = load_credentials()
+    conn = connect(credentials)
+    print(run_retention(conn, credentials["engine"], history_settings(credentials)))
+    close_connection(conn)
@@ -0,0 +1,88 @@
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+
+DEFAULT_PATH = "maritime_tracker.db"     # relative paths are resolved against core/database/
+BUSY_TIMEOUT_MS = 5000
+
+# WAL lets the display read while the receiver writes; NORMAL sync is safe in WAL mode
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -65536",          # 64 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",        # 256 MB
+)
+
+PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+# Timestamps are stored as 'YYYY-MM-DD HH:MM:SS' text, which sorts and compares correctly
+sqlite3.register_adapter(datetime, lambda value: value.strftime("%Y-%m-%d %H:%M:%S"))
+sqlite3.register_adapter(date, lambda value: value.strftime("%Y-%m-%d"))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+def database_path(path=None):
+    path = path or DEFAULT_PATH
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    return path
+
+def _translate(sql):
+    # The rest of the code uses the %s paramstyle of psycopg2 and mysql.connector
+    return PLACEHOLDER_RE.sub(lambda match: "%" if match.group() == "%%" else "?", sql)
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(_translate(sql), params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self.cursor.executemany(_translate(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def close(self):
+        self.cursor.close()
+
+class SQLiteConnection:
+    """sqlite3 connection that accepts the same SQL and placeholders as the server engines."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+def connect_sqlite(path=None):
+    path = database_path(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, detect_types=sqlite3.PARSE_DECLTYPES)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return SQLiteConnection(conn)
@@ -5,13 +5,11 @@ import json
 import time
 import ctypes
 from ctypes import wintypes
-from datetime import datetime, timedelta
 
 import pygame
 import rasterio
 import numpy as np
 import cv2
-import mediapipe as mp
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if PROJECT_ROOT not in sys.path:
@@ -19,6 +17,13 @@ if PROJECT_ROOT not in sys.path:
 
 
 from core.database.db_setup import load_credentials
+from core.database.connection import connect, close_connection
+from core.database.notify import UpdateListener
+from core.interactive.fleet import FleetState
+from core.interactive.projection import GeoProjection
+from core.ais.live_fleet import LiveFleetReader, current_segment
+from core.interactive.hand_tracking import HandTracker
+from core.calibration.capture import LatestFrameCapture
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))            # core/interactive/
@@ -26,7 +31,6 @@ CORE_DIR = os.path.dirname(BASE_DIR)                             # core/
 
 COORDINATES_PATH = os.path.join(CORE_DIR, "calibration", "coordinates.json")
 IMAGE_PATH = os.path.join(PROJECT_ROOT, "images", "georeferenced", "georeferenced_map.tif")
-TABLE_NAME = "ships"
 
 # ------- Load Configuration -------
 with open(COORDINATES_PATH, 'r') as f:
@@ -99,67 +103,163 @@ move_window_to_monitor(screen, monitor_index)
 pygame.display.set_caption("Cyclades Interactive")
 
 image_surface = pygame.surfarray.make_surface(image_data)
-image_surface = pygame.transform.scale(image_surface, (image_width, image_height))
+image_surface = pygame.transform.scale(image_surface, (image_width, image_height)).convert()
 image_rect = image_surface.get_rect(topleft=(image_x, image_y))
 
-cap = cv2.VideoCapture(0)
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.7)
-mp_drawing = mp.solutions.drawing_utils
+# Camera and MediaPipe run on their own thread; the renderer below keeps a fixed
+# clock and uses whichever hand state is newest
+RENDER_FPS = 60
+HAND_STATE_MAX_AGE = 0.5        # seconds before the cursor of a lost hand disappears
+RATE_REPORT_INTERVAL = 10       # seconds between render / tracking rate reports
+HAND_ROI_INFERENCE = False      # run MediaPipe on the downscaled calibrated region; enable once
+                                # benchmarks/hand_inference.py shows it faster with no lost detections
+
+cap = LatestFrameCapture()
+print(f"Camera: {cap}")
+calibrated_resolution = coordinates["camera"].get("resolution")
+if calibrated_resolution and calibrated_resolution != cap.resolution:
+    print(f"Warning: camera calibrated at {calibrated_resolution[0]}x{calibrated_resolution[1]} but delivers "
+          f"{cap.resolution[0]}x{cap.resolution[1]}; redo the camera calibration.")
+tracker = HandTracker(cap, polygon_points_array, roi=HAND_ROI_INFERENCE).start()
 
 # ------- Connect to Database -------
+# Waits for the database at startup; a connection lost later is replaced
+# with backoff while the map keeps showing the last known positions
 credentials = load_credentials()
-engine = credentials.pop("engine")
-
-if engine == "postgresql":
-    import psycopg2
-    conn = psycopg2.connect(**credentials)
-elif engine == "mysql":
-    import mysql.connector
-    conn = mysql.connector.connect(**credentials)
-else:
-    raise ValueError(f"Unsupported database engine: {engine}")
-
-cursor = conn.cursor()
-
-# ------- Utility Functions -------
-def geo_to_pixel(lat, lon, transform):
-    row, col = rasterio.transform.rowcol(transform, lon, lat)
-    return int(col * image_width / src_width), int(row * image_height / src_height)
-
-def fetch_ship_positions(start_time, end_time):
-    query = f"""
-        SELECT s.mmsi, s.latitude, s.longitude, s.image_path, s.name, s.destination, s.eta, s.navigation_status
-        FROM {TABLE_NAME} s
-        INNER JOIN (
-            SELECT mmsi, MAX(timestamp) AS latest_timestamp
-            FROM {TABLE_NAME}
-            WHERE timestamp BETWEEN %s AND %s
-            GROUP BY mmsi
-        ) latest ON s.mmsi = latest.mmsi AND s.timestamp = latest.latest_timestamp
-        ORDER BY s.timestamp DESC;
+conn = connect(credentials, wait=True)
+
+# Receiver pushes every committed batch; ticks read only new rows, catch up and expire old ships
+listener = UpdateListener(credentials)
+POLL_INTERVAL_MS = 60000            # tick interval while live updates arrive
+FALLBACK_POLL_INTERVAL_MS = 5000    # tick interval while they do not
+LIVE_FLEET_CHECK_INTERVAL = 1.0     # seconds between checks for a new or restarted receiver
+
+def open_live_fleet():
+    """Map the receiver's shared-memory fleet buffer, or None while no live receiver publishes one."""
+    try:
+        reader = LiveFleetReader()
+    except FileNotFoundError:
+        return None
+    if reader.stale:
+        # Left behind by a receiver that stopped without cleaning up
+        reader.close()
+        return None
+    return reader
+
+def check_live_fleet(reader):
     """
-    cursor.execute(query, (start_time, end_time))
-    ship_positions = cursor.fetchall()
-    return [
-        (mmsi, geo_to_pixel(lat, lon, transform), image_path, name, destination, eta, nav_status)
-        for mmsi, lat, lon, image_path, name, destination, eta, nav_status in ship_positions
-    ]
+    The buffer to read from now: the current one unless its receiver went
+    silent or a restarted receiver published a new segment.
+    """
+    try:
+        replaced = reader is not None and current_segment() != reader.name
+    except OSError:
+        replaced = False
+    if reader is not None and (reader.stale or replaced):
+        reader.close()
+        reader = None
+    return reader if reader is not None else open_live_fleet()
+
+# Real-time path: every fix the receiver sees, read from shared memory each frame.
+# The database stays the durable store and the fallback.
+live_fleet = open_live_fleet()
 
+# ------- Utility Functions -------
 def is_near_ship(ship_pos, x, y, threshold=20):
     ship_x, ship_y = ship_pos
     return np.hypot(ship_x - x, ship_y - y) <= threshold
 
-def is_index_touching_thumb(hand_landmarks):
-    index_tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-    thumb_tip = hand_landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP]
-    distance = np.sqrt((index_tip.x - thumb_tip.x)**2 + (index_tip.y - thumb_tip.y)**2 + (index_tip.z - thumb_tip.z)**2)
-    return distance < 0.075
-
-def refresh_ship_positions():
-    end_time = datetime.now()
-    start_time = end_time - timedelta(minutes=10)
-    return fetch_ship_positions(start_time, end_time)
+# ------- Rendering -------
+# The scaled map is built once. Ships are drawn onto a scene layer that is patched only where
+# they change; each frame the cursor and info panel are drawn over it and only the
+# rectangles that changed are sent to the display.
+SHIP_RADIUS = 5
+CURSOR_RADIUS = 10
+SHIP_COLOR = (255, 0, 0)
+SELECTED_COLOR = (255, 255, 0)
+CURSOR_COLOR = (0, 255, 0)
+MAX_DIRTY_RECTS = 200       # more changed ships than this update the whole map at once
+
+background = pygame.Surface((screen_width, screen_height)).convert()
+background.fill((0, 0, 0))
+background.blit(image_surface, image_rect)
+scene = background.copy()
+scene.set_clip(image_rect)
+
+def ship_dots(ship_positions, selected_mmsi):
+    """Screen position and colour of every ship dot."""
+    return {(x, y, SELECTED_COLOR if mmsi == selected_mmsi else SHIP_COLOR)
+            for mmsi, (x, y), *_ in ship_positions}
+
+def dot_rect(dot):
+    x, y, _ = dot
+    return pygame.Rect(x - SHIP_RADIUS - 1, y - SHIP_RADIUS - 1,
+                       2 * SHIP_RADIUS + 3, 2 * SHIP_RADIUS + 3).clip(image_rect)
+
+def redraw_scene(dots, changed):
+    """
+    Bring the scene up to date with `dots`, the selected ship drawn last so it
+    stays on top. Only the rectangles of the `changed` dots are restored from
+    the map and the dots overlapping them redrawn, clipped so untouched pixels
+    keep their stacking. Returns the rectangles that changed.
+    """
+    ordered = sorted(dots, key=lambda dot: dot[2] == SELECTED_COLOR)
+    if len(changed) > MAX_DIRTY_RECTS:
+        scene.blit(background, image_rect, image_rect)
+        for x, y, color in ordered:
+            pygame.draw.circle(scene, color, (x, y), SHIP_RADIUS)
+        return [image_rect]
+
+    rects = [dot_rect(dot) for dot in changed]
+    dot_rects = [dot_rect(dot) for dot in ordered]
+    for rect in rects:
+        scene.set_clip(rect)
+        scene.blit(background, rect, rect)
+        for i in rect.collidelistall(dot_rects):
+            x, y, color = ordered[i]
+            pygame.draw.circle(scene, color, (x, y), SHIP_RADIUS)
+    scene.set_clip(image_rect)
+    return rects
+
+def render_info_panel(mmsi, img_path, name, dest, eta, nav):
+    """Info panel of the selected ship, rendered once per selection instead of every frame."""
+    panel = pygame.Surface((200, 300)).convert()
+    panel.fill((255, 255, 255))
+    panel.blit(title_font.render(name or f"MMSI {mmsi}", True, (0, 0, 0)), (10, 10))
+
+    try:
+        if img_path and os.path.exists(img_path):
+            ship_img = pygame.image.load(img_path)
+            ship_img = pygame.transform.scale(ship_img, (180, 100))
+            panel.blit(ship_img, (10, 40))
+        else:
+            pygame.draw.rect(panel, (200, 200, 200), (10, 40, 180, 100))
+            panel.blit(text_font.render("No image", True, (0, 0, 0)), (70, 80))
+    except Exception:
+        pass
+
+    if nav == "Moored":
+        panel.blit(text_font.render("Moored / Στάσιμο", True, (0, 0, 0)), (10, 150))
+    else:
+        panel.blit(text_font.render("Destination:", True, (0, 0, 0)), (10, 150))
+        panel.blit(text_font.render(dest or "-", True, (0, 0, 0)), (10, 170))
+        panel.blit(text_font.render("ETA:", True, (0, 0, 0)), (10, 190))
+        panel.blit(text_font.render(eta or "-", True, (0, 0, 0)), (10, 210))
+    return panel
+
+def update_fleet():
+    """Read the positions stored since the last update; on errors the fleet keeps its last state."""
+    try:
+        cursor = conn.cursor()
+        try:
+            fleet.tick(cursor)
+        finally:
+            cursor.close()
+        # End the read transaction so the next tick sees new rows (MySQL reads are repeatable)
+        conn.commit()
+    except Exception as err:
+        conn.rollback()
+        print(f"Could not update ship positions: {err}")
 
 # Ship tracking state
 near_ship_start_time = None
@@ -169,48 +269,60 @@ selected_ship_start_time = None
 
 font_main = pygame.font.SysFont("Arial", 24)
 font_small = pygame.font.SysFont("Arial", 18)
+title_font = pygame.font.SysFont("Arial", 16, bold=True)
+text_font = pygame.font.SysFont("Arial", 10)
 screen_refresh_event = pygame.USEREVENT
-pygame.time.set_timer(screen_refresh_event, 60000)
+pygame.time.set_timer(screen_refresh_event,
+                      POLL_INTERVAL_MS if listener.connected or live_fleet else FALLBACK_POLL_INTERVAL_MS)
 
 # ------- Main Application Loop -------
 running = True
-ship_positions = refresh_ship_positions()
-
-while running and cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    result = hands.process(frame_rgb)
-    
-    cv2.polylines(frame, [polygon_points_array], isClosed=True, color=(255, 0, 0), thickness=2)
-
-    # Update ship map
-    map_surface = pygame.surfarray.make_surface(image_data)
-    map_surface = pygame.transform.scale(map_surface, (image_width, image_height))
-
-    for mmsi, (x, y), img_path, name, dest, eta, nav in ship_positions:
-        color = (255, 255, 0) if selected_ship_mmsi == mmsi else (255, 0, 0)
-        pygame.draw.circle(map_surface, color, (x, y), 5)
-
-    # Hand detection and interaction
-    if result.multi_hand_landmarks:
-        for hand_landmarks in result.multi_hand_landmarks:
-            mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            h, w, _ = frame.shape
-            index_x = int(hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].x * w)
-            index_y = int(hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].y * h)
+projection = GeoProjection(transform, src_width, src_height, image_width, image_height, (image_x, image_y))
+fleet = FleetState(projection.pixels)     # ships in projector pixels
+update_fleet()
+ship_positions = fleet.positions()
+
+# Render state: what the scene layer shows and which overlay rectangles are on screen
+scene_positions = None
+scene_selected = None
+scene_dots = set()
+overlay_rects = []
+info_panel_key = None
+info_panel = None
+screen.blit(background, (0, 0))
+pygame.display.flip()
 
+hand_state = None
+cursors = []
+clock = pygame.time.Clock()
+rendered_frames = 0
+last_rate_report = time.monotonic()
+live_fleet_checked = time.monotonic()
+
+while running and tracker.alive:
+    if time.monotonic() - live_fleet_checked >= LIVE_FLEET_CHECK_INTERVAL:
+        live_fleet = check_live_fleet(live_fleet)
+        live_fleet_checked = time.monotonic()
+    if live_fleet is not None and fleet.apply_records(live_fleet.read()):
+        ship_positions = fleet.positions()
+    if fleet.apply(listener.poll()):
+        ship_positions = fleet.positions()
+
+    # Hand interaction, once per new tracking result
+    state = tracker.latest()
+    if state is not None and state is not hand_state:
+        hand_state = state
+        cv2.imshow("Webcam Feed", state.frame)
+        cursors = []
+        for index_x, index_y, pinching in state.fingertips:
             if cv2.pointPolygonTest(polygon_points_array, (index_x, index_y), False) >= 0:
-                cv2.circle(frame, (index_x, index_y), 10, (0, 255, 0), -1)
                 map_x = int((index_x - camera_top_left[0]) / (camera_bottom_right[0] - camera_top_left[0]) * image_width)
                 map_y = int((index_y - camera_top_left[1]) / (camera_bottom_right[1] - camera_top_left[1]) * image_height)
-                pygame.draw.circle(map_surface, (0, 255, 0), (map_x, map_y), 10)
+                cursor_x, cursor_y = image_x + map_x, image_y + map_y
+                cursors.append((cursor_x, cursor_y))
 
                 for mmsi, (sx, sy), img_path, name, dest, eta, nav in ship_positions:
-                    if is_near_ship((sx, sy), map_x, map_y):
+                    if is_near_ship((sx, sy), cursor_x, cursor_y):
                         if near_ship_start_time is None:
                             near_ship_start_time = time.time()
                             current_ship_mmsi = mmsi
@@ -222,62 +334,67 @@ while running and cap.isOpened():
                     near_ship_start_time = None
                     current_ship_mmsi = None
 
-            if selected_ship_mmsi and is_index_touching_thumb(hand_landmarks):
+            if selected_ship_mmsi and pinching:
                 selected_ship_mmsi = None
                 selected_ship_start_time = None
+    elif hand_state is not None and time.monotonic() - hand_state.captured > HAND_STATE_MAX_AGE:
+        cursors = []
 
     # Display overlays
-    cv2.imshow("Webcam Feed", frame)
-    screen.fill((0, 0, 0))
-    screen.blit(map_surface, image_rect)
-
+    info_panel_pos = None
     if selected_ship_mmsi:
         for mmsi, _, img_path, name, dest, eta, nav in ship_positions:
             if mmsi == selected_ship_mmsi:
-                info_x = image_x + image_width - 210
-                info_y = image_y + 10
-                pygame.draw.rect(screen, (255, 255, 255), (info_x, info_y, 200, 300))
-
-                title_font = pygame.font.SysFont("Arial", 16, bold=True)
-                text_font = pygame.font.SysFont("Arial", 10)
-
-                screen.blit(title_font.render(name, True, (0, 0, 0)), (info_x + 10, info_y + 10))
-
-                try:
-                    if os.path.exists(img_path):
-                        ship_img = pygame.image.load(img_path)
-                        ship_img = pygame.transform.scale(ship_img, (180, 100))
-                        screen.blit(ship_img, (info_x + 10, info_y + 40))
-                    else:
-                        pygame.draw.rect(screen, (200, 200, 200), (info_x + 10, info_y + 40, 180, 100))
-                        screen.blit(text_font.render("No image", True, (0, 0, 0)), (info_x + 70, info_y + 80))
-                except Exception:
-                    pass
-
-                if nav == "Moored":
-                    screen.blit(text_font.render("Moored / Στάσιμο", True, (0, 0, 0)), (info_x + 10, info_y + 150))
-                else:
-                    screen.blit(text_font.render("Destination:", True, (0, 0, 0)), (info_x + 10, info_y + 150))
-                    screen.blit(text_font.render(dest, True, (0, 0, 0)), (info_x + 10, info_y + 170))
-                    screen.blit(text_font.render("ETA:", True, (0, 0, 0)), (info_x + 10, info_y + 190))
-                    screen.blit(text_font.render(eta, True, (0, 0, 0)), (info_x + 10, info_y + 210))
+                key = (mmsi, img_path, name, dest, eta, nav)
+                if key != info_panel_key:
+                    info_panel = render_info_panel(*key)
+                    info_panel_key = key
+                info_panel_pos = (image_x + image_width - 210, image_y + 10)
 
                 if time.time() - selected_ship_start_time >= 15:
                     selected_ship_mmsi = None
                     selected_ship_start_time = None
                 break
 
-    pygame.display.flip()
+    # Restore last frame's overlays from the scene, plus the ships that moved
+    dirty = overlay_rects
+    if ship_positions is not scene_positions or selected_ship_mmsi != scene_selected:
+        dots = ship_dots(ship_positions, selected_ship_mmsi)
+        changed = dots ^ scene_dots
+        if changed:
+            dirty = dirty + redraw_scene(dots, changed)
+        scene_positions, scene_selected, scene_dots = ship_positions, selected_ship_mmsi, dots
+    for rect in dirty:
+        screen.blit(scene, rect, rect)
+
+    overlay_rects = [pygame.draw.circle(screen, CURSOR_COLOR, cursor, CURSOR_RADIUS) for cursor in cursors]
+    if info_panel_pos is not None:
+        overlay_rects.append(screen.blit(info_panel, info_panel_pos))
+    pygame.display.update(dirty + overlay_rects)
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
             running = False
         elif event.type == screen_refresh_event:
-            ship_positions = refresh_ship_positions()
+            update_fleet()
+            ship_positions = fleet.positions()
+            pygame.time.set_timer(screen_refresh_event,
+                                  POLL_INTERVAL_MS if listener.connected or live_fleet else FALLBACK_POLL_INTERVAL_MS)
 
     if cv2.waitKey(1) & 0xFF == ord('q'):
         running = False
 
+    clock.tick(RENDER_FPS)
+    rendered_frames += 1
+    now = time.monotonic()
+    if now - last_rate_report >= RATE_REPORT_INTERVAL:
+        tracked_frames, tracking_latency = tracker.take_stats()
+        elapsed = now - last_rate_report
+        print(f"Render {rendered_frames / elapsed:.1f} fps | hand tracking {tracked_frames / elapsed:.1f} fps, "
+              f"{tracking_latency * 1000:.0f} ms latency | camera: {cap.stats()}")
+        rendered_frames = 0
+        last_rate_report = now
+
 # Show Closing Message
 screen.fill((0, 0, 0))
 closing_font = pygame.font.SysFont("Arial", 48, bold=True)
@@ -288,9 +405,12 @@ pygame.display.flip()
 time.sleep(2)
 
 # Shutdown 
+tracker.stop()
 cap.release()
 pygame.quit()
 cv2.destroyAllWindows()
-cursor.close()
-conn.close()
+if live_fleet is not None:
+    live_fleet.close()
+listener.close()
+close_connection(conn)
 sys.exit(0)
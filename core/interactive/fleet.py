@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core.database.queries import fetch_live_positions, fetch_last_position_id, fetch_new_positions
+from core.ais.live_fleet import record_details
+
+FRESHNESS_WINDOW = timedelta(minutes=10)
+
+def _as_datetime(value):
+    # Database rows carry datetimes, pushed updates carry 'YYYY-MM-DD HH:MM:SS' strings
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+class FleetState:
+    """
+    The live fleet keyed by MMSI. It is loaded once from ship_latest, then
+    kept current by reading only positions with an id above the last one
+    seen, and by merging pushed updates and the receiver's shared-memory
+    buffer. Ships not heard from within `window` are dropped locally,
+    without a query. Positions are kept in degrees and projected for the
+    whole fleet at once when the map needs them.
+    """
+    def __init__(self, project, window=FRESHNESS_WINDOW):
+        self.project = project      # (lats, lons) arrays -> (n, 2) pixels, e.g. GeoProjection.pixels
+        self.window = window
+        self.ships = {}             # mmsi -> [timestamp, (lat, lon), image_path, name, destination, eta, nav_status]
+        self.last_id = 0
+        self.loaded = False
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ships)
+
+    def _merge_position(self, mmsi, timestamp, lat, lon):
+        timestamp = _as_datetime(timestamp)
+        ship = self.ships.get(mmsi)
+        if ship is None:
+            self.ships[mmsi] = [timestamp, (lat, lon), None, None, None, None, None]
+        elif ship[1] is None or timestamp >= ship[0]:
+            ship[0] = timestamp
+            ship[1] = (lat, lon)
+        else:
+            return False
+        self._positions = None
+        return True
+
+    def _merge_details(self, mmsi, details, now=None):
+        """Fill in image_path, name, destination, eta, nav_status; missing values keep the old ones."""
+        ship = self.ships.get(mmsi)
+        if ship is None:
+            # Details of a ship not on the map yet wait for its first position
+            ship = self.ships[mmsi] = [now or datetime.now(), None, None, None, None, None, None]
+        for i, value in enumerate(details, start=2):
+            if value:
+                ship[i] = value
+        self._positions = None
+
+    def load(self, cursor, now=None):
+        now = now or datetime.now()
+        # Read the id first: rows stored while ship_latest is read come again with the next tick
+        self.last_id = fetch_last_position_id(cursor)
+        self.ships = {}
+        for mmsi, lat, lon, image_path, name, destination, eta, nav_status, timestamp in \
+                fetch_live_positions(cursor, now - self.window):
+            self._merge_position(mmsi, timestamp, lat, lon)
+            self._merge_details(mmsi, (image_path, name, destination, eta, nav_status))
+        self.loaded = True
+        self._positions = None
+        return len(self.ships)
+
+    def tick(self, cursor, now=None):
+        """Merge the positions stored since the last tick and expire stale ships. Returns rows read."""
+        if not self.loaded:
+            return self.load(cursor, now)
+        rows = fetch_new_positions(cursor, self.last_id)
+        for row_id, mmsi, lat, lon, image_path, name, destination, eta, nav_status, timestamp in rows:
+            self._merge_position(mmsi, timestamp, lat, lon)
+            self._merge_details(mmsi, (image_path, name, destination, eta, nav_status))
+            self.last_id = max(self.last_id, row_id)
+        self.expire(now)
+        return len(rows)
+
+    def apply(self, messages):
+        """Merge UpdateNotifier messages. Returns True if the fleet changed."""
+        changed = False
+        for message in messages:
+            for mmsi, timestamp, lat, lon in message.get("p", []):
+                changed = self._merge_position(mmsi, timestamp, lat, lon) or changed
+            for mmsi, name, image_path, nav_status, destination, eta in message.get("v", []):
+                self._merge_details(mmsi, (image_path, name, destination, eta, nav_status))
+                changed = True
+        return changed
+
+    def apply_records(self, records):
+        """Merge the changed rows of a LiveFleetReader. Returns True if the fleet changed."""
+        for record in records:
+            mmsi = int(record["mmsi"])
+            if record["timestamp"]:
+                self._merge_position(mmsi, datetime.fromtimestamp(record["timestamp"]),
+                                     float(record["latitude"]), float(record["longitude"]))
+            details = record_details(record)
+            self._merge_details(mmsi, (details["image_path"], details["name"], details["destination"],
+                                       details["eta"], details["navigation_status"]))
+        return len(records) > 0
+
+    def expire(self, now=None):
+        cutoff = (now or datetime.now()) - self.window
+        stale = [mmsi for mmsi, ship in self.ships.items() if ship[0] < cutoff]
+        for mmsi in stale:
+            del self.ships[mmsi]
+        if stale:
+            self._positions = None
+        return len(stale)
+
+    def positions(self):
+        """Ships on the map as (mmsi, (x, y), image_path, name, destination, eta, nav_status)."""
+        if self._positions is None:
+            placed = [(mmsi, ship) for mmsi, ship in self.ships.items() if ship[1] is not None]
+            coordinates = np.fromiter((value for _, ship in placed for value in ship[1]),
+                                      dtype=np.float64, count=2 * len(placed)).reshape(-1, 2)
+            pixels = self.project(coordinates[:, 0], coordinates[:, 1]).tolist()
+            self._positions = [(mmsi, tuple(pixel), *ship[2:]) for (mmsi, ship), pixel in zip(placed, pixels)]
+        return self._positions
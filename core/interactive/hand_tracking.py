@@ -0,0 +1,152 @@
+import time
+import threading
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+mp_hands = mp.solutions.hands
+mp_drawing = mp.solutions.drawing_utils
+
+PINCH_DISTANCE = 0.075          # index-thumb distance, in normalised landmark units, that counts as a pinch
+ROI_MARGIN = 60                 # camera pixels kept around the calibrated rectangle when cropping
+INFERENCE_WIDTH = 320           # width the crop is scaled down to for MediaPipe
+
+class HandState:
+    """One processed camera frame: fingertips in camera pixels, with the times it was captured and processed."""
+    def __init__(self, frame, fingertips, captured, processed):
+        self.frame = frame              # annotated camera frame for the preview window
+        self.fingertips = fingertips    # [(x, y, pinching)] per detected hand
+        self.captured = captured
+        self.processed = processed
+
+    @property
+    def latency(self):
+        return self.processed - self.captured
+
+def is_index_touching_thumb(hand_landmarks):
+    index_tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
+    thumb_tip = hand_landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP]
+    distance = np.sqrt((index_tip.x - thumb_tip.x)**2 + (index_tip.y - thumb_tip.y)**2 + (index_tip.z - thumb_tip.z)**2)
+    return distance < PINCH_DISTANCE
+
+def inference_crop(region, frame_shape, margin=ROI_MARGIN):
+    """(x0, y0, x1, y1) of the region's bounding box plus margin, clamped to the frame."""
+    x, y, w, h = cv2.boundingRect(region)
+    height, width = frame_shape[:2]
+    return max(x - margin, 0), max(y - margin, 0), min(x + w + margin, width), min(y + h + margin, height)
+
+class HandDetector:
+    """
+    MediaPipe Hands on a camera frame. With a crop the frame is cut to it and
+    scaled down to inference_width before inference, and the landmarks are
+    mapped back to normalised full-frame coordinates, so callers cannot tell
+    the two modes apart.
+    """
+    def __init__(self, crop=None, inference_width=INFERENCE_WIDTH,
+                 min_detection_confidence=0.7, min_tracking_confidence=0.7):
+        self.crop = crop
+        self.inference_width = inference_width
+        self.hands = mp_hands.Hands(min_detection_confidence=min_detection_confidence,
+                                    min_tracking_confidence=min_tracking_confidence)
+
+    def process(self, frame):
+        """Hand landmarks found in a BGR frame, in full-frame coordinates."""
+        if self.crop is None:
+            return self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).multi_hand_landmarks or []
+
+        x0, y0, x1, y1 = self.crop
+        image = frame[y0:y1, x0:x1]
+        if self.inference_width and image.shape[1] > self.inference_width:
+            scale = self.inference_width / image.shape[1]
+            image = cv2.resize(image, (self.inference_width, max(int(image.shape[0] * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+        hands = self.hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).multi_hand_landmarks or []
+
+        height, width = frame.shape[:2]
+        crop_width, crop_height = x1 - x0, y1 - y0
+        for hand_landmarks in hands:
+            for landmark in hand_landmarks.landmark:
+                landmark.x = (x0 + landmark.x * crop_width) / width
+                landmark.y = (y0 + landmark.y * crop_height) / height
+                landmark.z *= crop_width / width    # depth shares the x scale
+        return hands
+
+    def close(self):
+        self.hands.close()
+
+class HandTracker:
+    """
+    Reads the camera and runs MediaPipe on a worker thread, so inference
+    latency no longer caps the projector frame rate. Only the latest result
+    is kept; the renderer picks it up at its own rate with latest().
+    """
+    def __init__(self, capture, region, roi=False, inference_width=INFERENCE_WIDTH):
+        self.capture = capture          # LatestFrameCapture, so every frame processed is the newest
+        self.region = region            # camera polygon covering the map, drawn on the preview
+        self.roi = roi                  # run MediaPipe on the downscaled region only
+        self.inference_width = inference_width
+        self.detector = None            # created on the first frame, when its size is known
+        self.lock = threading.Lock()
+        self.state = None
+        self.frames = 0
+        self.latency_total = 0.0
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="hand-tracking", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def alive(self):
+        return self.thread.is_alive()
+
+    def _run(self):
+        while not self.stopping:
+            frame, captured = self.capture.read_latest()
+            if frame is None:
+                print("Camera stopped delivering frames.")
+                return
+
+            frame = cv2.flip(frame, 1)
+            if self.detector is None:
+                crop = inference_crop(self.region, frame.shape) if self.roi else None
+                self.detector = HandDetector(crop, self.inference_width)
+            hand_landmarks_list = self.detector.process(frame)
+            cv2.polylines(frame, [self.region], isClosed=True, color=(255, 0, 0), thickness=2)
+
+            fingertips = []
+            h, w, _ = frame.shape
+            for hand_landmarks in hand_landmarks_list:
+                mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                index_tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
+                x, y = int(index_tip.x * w), int(index_tip.y * h)
+                if cv2.pointPolygonTest(self.region, (x, y), False) >= 0:
+                    cv2.circle(frame, (x, y), 10, (0, 255, 0), -1)
+                fingertips.append((x, y, is_index_touching_thumb(hand_landmarks)))
+
+            state = HandState(frame, fingertips, captured, time.monotonic())
+            with self.lock:
+                self.state = state
+                self.frames += 1
+                self.latency_total += state.latency
+
+    def latest(self):
+        """Most recent HandState, or None before the first frame."""
+        with self.lock:
+            return self.state
+
+    def take_stats(self):
+        """Frames processed and their mean latency since the last call."""
+        with self.lock:
+            frames, latency = self.frames, self.latency_total
+            self.frames, self.latency_total = 0, 0.0
+        return frames, latency / frames if frames else 0.0
+
+    def stop(self):
+        self.stopping = True
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+        if self.detector is not None and not self.thread.is_alive():
+            self.detector.close()
@@ -0,0 +1,26 @@
+import numpy as np
+
+class GeoProjection:
+    """
+    Latitude/longitude to projector pixels in one matrix multiply. The
+    GeoTIFF transform is inverted once and folded together with the
+    scaling to the projected map size and the map's offset on the projector
+    from calibration, so a whole fleet is projected with array arithmetic
+    instead of a rowcol call per ship. With map_origin (0, 0) the pixels
+    are relative to the map image.
+    """
+    def __init__(self, transform, src_width, src_height, map_width, map_height, map_origin=(0, 0)):
+        a, b, c, d, e, f = tuple(transform)[:6]
+        inverse = np.linalg.inv(np.array([[a, b, c], [d, e, f], [0.0, 0.0, 1.0]]))     # (lon, lat) -> (col, row)
+        scale = np.diag([map_width / src_width, map_height / src_height, 1.0])
+        self.matrix = (scale @ inverse)[:2]
+        self.matrix[:, 2] += map_origin
+
+    def pixels(self, lats, lons):
+        """(n, 2) int32 pixels for arrays of latitudes and longitudes."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        pixels = np.empty((lons.size, 2))
+        pixels[:, 0] = self.matrix[0, 0] * lons + self.matrix[0, 1] * lats + self.matrix[0, 2]
+        pixels[:, 1] = self.matrix[1, 0] * lons + self.matrix[1, 1] * lats + self.matrix[1, 2]
+        return np.floor(pixels).astype(np.int32)
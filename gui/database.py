@@ -5,6 +5,9 @@ from tkinter import ttk, messagebox
 import psycopg2
 import pymysql
 
+from core.database.db_setup import upgrade_database, DEFAULT_HISTORY, PARTITIONING_OPTIONS
+from core.database.retention import effective_partitioning
+from core.database.sqlite_backend import connect_sqlite, database_path, DEFAULT_PATH
 from gui.gui_components import (
     create_back_button,
     create_header,
@@ -13,12 +16,14 @@ from gui.gui_components import (
 )
 
 CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), "..", "core", "database", "credentials.json")
+OVERWRITE_PROMPT = ("Database exists. Overwrite?\n\n"
+                    "Choose 'No' to keep the existing data and upgrade its tables.")
 
 class DatabaseSetupWindow:
     def __init__(self, master):
         self.master = master
         self.master.title("Database Setup")
-        self.master.geometry("500x600")
+        self.master.geometry("500x800")
         self.master.configure(bg="#e8f0f2")
         self.create_widgets()
 
@@ -36,16 +41,28 @@ class DatabaseSetupWindow:
         tk.Label(form, text="Database Engine:", font=label_font, bg="#e8f0f2").grid(row=0, column=0, sticky="w", pady=(5, 0))
         self.engine_var = tk.StringVar(value="postgresql")
         engine_dropdown = ttk.Combobox(form, textvariable=self.engine_var,
-                                       values=["postgresql", "mysql"], width=entry_width - 2, state="readonly")
+                                       values=["postgresql", "mysql", "sqlite"], width=entry_width - 2, state="readonly")
         engine_dropdown.grid(row=1, column=0, pady=5)
         engine_dropdown.bind("<<ComboboxSelected>>", self.set_default_fields)
 
-        self.host_entry = self._create_field(form, "Host:", 2, "localhost")
+        self.host_entry = self._create_field(form, "Host / SQLite File:", 2, "localhost")
         self.port_entry = self._create_field(form, "Port:", 4, "5432")
         self.user_entry = self._create_field(form, "Username:", 6, "postgres")
         self.pass_entry = self._create_field(form, "Password:", 8, "", show="*")
 
-        create_main_button(self.master, "Create Database and Table", self.connect_and_setup).pack(pady=30)
+        tk.Label(form, text="History Partitioning:", font=label_font, bg="#e8f0f2").grid(row=10, column=0, sticky="w", pady=(10, 0))
+        self.partitioning_var = tk.StringVar(value=DEFAULT_HISTORY["partitioning"])
+        ttk.Combobox(form, textvariable=self.partitioning_var, values=list(PARTITIONING_OPTIONS),
+                     width=entry_width - 2, state="readonly").grid(row=11, column=0, pady=5)
+
+        self.retention_entry = self._create_field(form, "Keep History (days, 0 = forever):", 12,
+                                                  str(DEFAULT_HISTORY["retention_days"]))
+
+        self.rollup_var = tk.BooleanVar(value=DEFAULT_HISTORY["hourly_rollup"])
+        tk.Checkbutton(form, text="Keep hourly tracks of deleted history", variable=self.rollup_var,
+                       font=label_font, bg="#e8f0f2", activebackground="#e8f0f2").grid(row=14, column=0, sticky="w", pady=5)
+
+        create_main_button(self.master, "Create Database and Tables", self.connect_and_setup).pack(pady=30)
 
     def _create_field(self, parent, label, row, default="", show=None):
         tk.Label(parent, text=label, font=("Helvetica", 10), bg="#e8f0f2").grid(row=row, column=0, sticky="w", pady=(10, 0))
@@ -55,6 +72,11 @@ class DatabaseSetupWindow:
         return entry
 
     def set_default_fields(self, event=None):
+        # SQLite only needs a file, entered in the Host field
+        server_state = "disabled" if self.engine_var.get() == "sqlite" else "normal"
+        for entry in (self.port_entry, self.user_entry, self.pass_entry):
+            entry.config(state=server_state)
+
         if self.engine_var.get() == "postgresql":
             self.port_entry.delete(0, tk.END)
             self.port_entry.insert(0, "5432")
@@ -65,6 +87,8 @@ class DatabaseSetupWindow:
             self.port_entry.insert(0, "3306")
             self.user_entry.delete(0, tk.END)
             self.user_entry.insert(0, "root")
+        self.host_entry.delete(0, tk.END)
+        self.host_entry.insert(0, DEFAULT_PATH if self.engine_var.get() == "sqlite" else "localhost")
 
     def connect_and_setup(self):
         engine = self.engine_var.get()
@@ -74,11 +98,30 @@ class DatabaseSetupWindow:
         password = self.pass_entry.get()
         db_name = "maritime_tracker"
 
+        try:
+            retention_days = int(self.retention_entry.get() or 0)
+        except ValueError:
+            messagebox.showerror("Invalid Value", "History retention must be a whole number of days.")
+            return
+        history = {
+            "partitioning": self.partitioning_var.get(),
+            "retention_days": max(retention_days, 0),
+            "hourly_rollup": self.rollup_var.get(),
+        }
+
         try:
             if engine == "postgresql":
-                self.setup_postgres(host, port, user, password, db_name)
+                partitioning = self.setup_postgres(host, port, user, password, db_name, history)
             elif engine == "mysql":
-                self.setup_mysql(host, port, user, password, db_name)
+                partitioning = self.setup_mysql(host, port, user, password, db_name, history)
+            elif engine == "sqlite":
+                partitioning = self.setup_sqlite(host, history)
+            self.check_partitioning(history, partitioning)
+
+            if engine == "sqlite":
+                self.save_credentials({"engine": engine, "path": host, "history": history})
+                messagebox.showinfo("Success", "Database and tables created successfully!")
+                return
 
             self.save_credentials({
                 "engine": engine,
@@ -86,9 +129,10 @@ class DatabaseSetupWindow:
                 "port": port,
                 "user": user,
                 "password": password,
-                "database": db_name
+                "database": db_name,
+                "history": history
             })
-            messagebox.showinfo("Success", "Database and table created successfully!")
+            messagebox.showinfo("Success", "Database and tables created successfully!")
 
         except Exception as e:
             err = str(e).lower()
@@ -101,69 +145,61 @@ class DatabaseSetupWindow:
             else:
                 messagebox.showerror("Error", f"Unexpected error:\n{e}")
 
-    def setup_postgres(self, host, port, user, password, db_name):
+    def setup_postgres(self, host, port, user, password, db_name, history):
         conn = psycopg2.connect(dbname="postgres", user=user, password=password, host=host, port=port)
         conn.autocommit = True
         cur = conn.cursor()
         cur.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}';")
-        if cur.fetchone():
-            if not messagebox.askyesno("Overwrite?", "Database exists. Overwrite?"):
-                conn.close()
-                return
+        if not cur.fetchone():
+            cur.execute(f"CREATE DATABASE {db_name};")
+        elif messagebox.askyesno("Overwrite?", OVERWRITE_PROMPT):
             cur.execute(f"DROP DATABASE {db_name};")
-        cur.execute(f"CREATE DATABASE {db_name};")
+            cur.execute(f"CREATE DATABASE {db_name};")
         conn.close()
 
         conn = psycopg2.connect(dbname=db_name, user=user, password=password, host=host, port=port)
-        cur = conn.cursor()
-        cur.execute("""
-            DROP TABLE IF EXISTS ships;
-            CREATE TABLE ships (
-                id SERIAL PRIMARY KEY,
-                timestamp TIMESTAMP,
-                mmsi BIGINT,
-                latitude NUMERIC(9,6),
-                longitude NUMERIC(9,6),
-                speed NUMERIC(5,2),
-                image_path TEXT,
-                name TEXT,
-                destination TEXT,
-                eta TEXT,
-                navigation_status TEXT
-            );
-        """)
-        conn.commit()
+        upgrade_database(conn, "postgresql", history)
+        partitioning = effective_partitioning(conn, "postgresql", history["partitioning"])
         conn.close()
+        return partitioning
 
-    def setup_mysql(self, host, port, user, password, db_name):
+    def setup_mysql(self, host, port, user, password, db_name, history):
         conn = pymysql.connect(host=host, user=user, password=password, port=int(port))
         cur = conn.cursor()
         cur.execute("SHOW DATABASES;")
-        if db_name in [db[0] for db in cur.fetchall()]:
-            if not messagebox.askyesno("Overwrite?", "Database exists. Overwrite?"):
-                conn.close()
-                return
+        if db_name not in [db[0] for db in cur.fetchall()]:
+            cur.execute(f"CREATE DATABASE {db_name};")
+        elif messagebox.askyesno("Overwrite?", OVERWRITE_PROMPT):
             cur.execute(f"DROP DATABASE {db_name};")
-        cur.execute(f"CREATE DATABASE {db_name};")
+            cur.execute(f"CREATE DATABASE {db_name};")
         conn.select_db(db_name)
-        cur.execute("DROP TABLE IF EXISTS ships;")
-        cur.execute("""
-            CREATE TABLE ships (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                timestamp DATETIME,
-                mmsi BIGINT,
-                latitude DECIMAL(9,6),
-                longitude DECIMAL(9,6),
-                speed DECIMAL(5,2),
-                image_path TEXT,
-                name TEXT,
-                destination TEXT,
-                eta TEXT,
-                navigation_status TEXT
-            );
-        """)
-        conn.commit()
+        upgrade_database(conn, "mysql", history)
+        partitioning = effective_partitioning(conn, "mysql", history["partitioning"])
+        conn.close()
+        return partitioning
+
+    def setup_sqlite(self, path, history):
+        path = database_path(path)
+        if os.path.exists(path) and messagebox.askyesno("Overwrite?", OVERWRITE_PROMPT):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        conn = connect_sqlite(path)
+        upgrade_database(conn, "sqlite", history)
+        partitioning = effective_partitioning(conn, "sqlite", history["partitioning"])
         conn.close()
+        return partitioning
+
+    def check_partitioning(self, history, partitioning):
+        # Partitioning is chosen when the history table is created; an existing table keeps its layout
+        if partitioning != history["partitioning"]:
+            messagebox.showwarning(
+                "Partitioning Not Applied",
+                f"The position history is kept with '{partitioning}' partitioning, not "
+                f"'{history['partitioning']}': an existing table keeps its layout, and SQLite has "
+                f"no partitions.\n\nRecreate the database to change it. The saved settings use "
+                f"'{partitioning}'.")
+            history["partitioning"] = partitioning
 
     def save_credentials(self, config):
         os.makedirs(os.path.dirname(CREDENTIALS_PATH), exist_ok=True)